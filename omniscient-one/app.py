@@ -10,19 +10,37 @@ OMNISCIENT ONE - PRODUCTION TRADING PLATFORM
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import time
 import os
+import io
+import copy
 import sys
 import json
+import logging
+import pickle
+import threading
 import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger("omniscient")
+logger.setLevel(logging.WARNING)
+
 # Add src directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
+from src.scanner_kernels import analyze_batch, stack_tails
+
+# Try to import PyArrow for multi-threaded CSV parsing
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 # ============================================================================
 # IMPORT AND INITIALIZE SOURCE MODULES
 # ============================================================================
@@ -37,11 +55,11 @@ try:
     subscription = get_subscription_manager()
     
     MODULES_AVAILABLE = True
-    print("✅ All source modules loaded successfully")
+    logger.debug("All source modules loaded successfully")
     
 except ImportError as e:
     MODULES_AVAILABLE = False
-    print(f"❌ Module import error: {e}")
+    logger.warning("Module import error: %s", e)
     # Create mock managers for demo
     auth = None
     db = None
@@ -61,6 +79,14 @@ class ProductionConfig:
     S3_ENDPOINT = "https://files.massive.com"
     S3_BUCKET = "flatfiles"
     
+    # Local parquet cache of daily bars pulled from S3
+    BAR_CACHE_DIR = os.path.join("data", "cache", "bars")
+    BAR_CACHE_MAX_AGE = 3600  # seconds before S3 is checked for updates
+    
+    # Last scan per max_picks, kept on disk so a restart can reuse a recent scan
+    SCAN_CACHE_DIR = os.path.join("data", "cache", "scans")
+    SCAN_CACHE_MAX_AGE = 60  # seconds
+    
     # Colors
     PRIMARY_BLACK = "#000000"
     NEON_GREEN = "#00FF88"
@@ -71,12 +97,73 @@ class ProductionConfig:
 
 CONFIG = ProductionConfig()
 
+def _atomic_write(path, write_fn):
+    """Have write_fn(tmp_path) write a temp file, then swap it in so readers never see half a file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    write_fn(tmp_path)
+    os.replace(tmp_path, path)
+
 # ============================================================================
 # LIVE DATA ENGINE
 # ============================================================================
+class RateLimiter:
+    """Sliding-window rate limiter - only blocks once the budget is spent"""
+    
+    def __init__(self, calls, period=1.0):
+        self.calls = calls
+        self.period = period
+        self._timestamps = deque()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Wait until another call fits into the current window"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._timestamps and now - self._timestamps[0] >= self.period:
+                    self._timestamps.popleft()
+                
+                if len(self._timestamps) < self.calls:
+                    self._timestamps.append(now)
+                    return
+                
+                wait = self.period - (now - self._timestamps[0])
+            time.sleep(wait)
+
+@st.cache_resource(show_spinner=False)
+def _get_s3_client():
+    """Create the S3 client once and share it across engines and reruns"""
+    import boto3
+    from botocore.client import Config
+    
+    session = boto3.session.Session(
+        aws_access_key_id=CONFIG.S3_ACCESS_KEY,
+        aws_secret_access_key=CONFIG.S3_SECRET_KEY
+    )
+    return session.client(
+        's3',
+        endpoint_url=CONFIG.S3_ENDPOINT,
+        config=Config(
+            signature_version='s3v4',
+            max_pool_connections=64,
+            tcp_keepalive=True,
+            connect_timeout=2,
+            read_timeout=5,
+            retries={'mode': 'adaptive', 'max_attempts': 3}
+        )
+    )
+
+# Base Open/High/Low/Close levels for generated sample bars
+_SAMPLE_OFFSETS = np.array([100.0, 105.0, 95.0, 100.0])
+
 class LiveDataEngine:
     """Real-time data engine with S3 integration"""
     
+    # Shared across instances so concurrent scans can't flood S3/yfinance
+    _fetch_slots = threading.Semaphore(8)
+    _rate_limit = RateLimiter(calls=10, period=1.0)
+    
     def __init__(self):
         self.s3_config = {
             'access_key': CONFIG.S3_ACCESS_KEY,
@@ -87,85 +174,271 @@ class LiveDataEngine:
         
         # Try to import boto3
         try:
-            import boto3
-            from botocore.client import Config
+            # Shared client - built once per process, not once per rerun
+            self.s3_client = _get_s3_client()
             self.boto3_available = True
-            
-            # Initialize S3 client
-            self.s3_client = boto3.client(
-                's3',
-                endpoint_url=self.s3_config['endpoint'],
-                aws_access_key_id=self.s3_config['access_key'],
-                aws_secret_access_key=self.s3_config['secret_key'],
-                config=Config(signature_version='s3v4')
-            )
         except ImportError:
             self.boto3_available = False
         except Exception as e:
             self.boto3_available = False
-            print(f"S3 connection error: {e}")
+            logger.warning("S3 connection error: %s", e)
     
     def get_market_data(self, ticker):
-        """Get market data from S3 or fallback"""
+        """Get market data from S3 or fallback (cached for 60s)"""
+        return _fetch_market_data(self, ticker)
+    
+    def get_many(self, tickers):
+        """Get market data for many tickers: parallel S3 GETs, one batched fallback"""
+        tickers = list(tickers)
+        if not tickers:
+            return {}
+        
+        # Tickers with a fresh local cache don't need to hit S3 at all, and
+        # without boto3 only those can be served locally. A ticker with no S3
+        # file just 404s on its GET and drops through to the fallback below.
+        if self.boto3_available:
+            on_s3 = set(tickers)
+        else:
+            on_s3 = {ticker for ticker in tickers if self._has_fresh_cache(ticker)}
+        results = dict.fromkeys(tickers)
+        
+        if on_s3:
+            with ThreadPoolExecutor(max_workers=min(32, len(on_s3))) as executor:
+                futures = {
+                    ticker: executor.submit(self._fetch_s3, ticker)
+                    for ticker in tickers if ticker in on_s3
+                }
+            for ticker, future in futures.items():
+                try:
+                    results[ticker] = future.result()
+                except Exception:
+                    results[ticker] = None
+        
+        # Everything S3 couldn't serve goes to Yahoo Finance in one request
+        missing = [ticker for ticker, data in results.items() if data is None]
+        if missing:
+            results.update(self.get_many_fallback(missing))
+        return results
+    
+    def get_many_fallback(self, tickers):
+        """Fetch many tickers from Yahoo Finance in a single batched download"""
+        tickers = list(tickers)
         try:
-            # Try S3 first
-            if self.boto3_available:
-                # Example S3 key - adjust based on your S3 structure
-                s3_key = f"stocks/{ticker.upper()}/daily.csv"
-                response = self.s3_client.get_object(
-                    Bucket=self.s3_config['bucket'],
-                    Key=s3_key
+            import yfinance as yf
+            with self._fetch_slots:
+                self._rate_limit.acquire()
+                data = yf.download(
+                    " ".join(tickers),
+                    period="1mo",
+                    interval="1d",
+                    group_by='ticker',
+                    threads=True,
+                    progress=False
                 )
-                data = pd.read_csv(response['Body'])
-                
-                if 'timestamp' in data.columns:
-                    data['timestamp'] = pd.to_datetime(data['timestamp'])
-                    data.set_index('timestamp', inplace=True)
+        except:
+            data = None
+        
+        results = {}
+        for ticker in tickers:
+            if data is None:
+                frame = None
+            elif isinstance(data.columns, pd.MultiIndex):
+                frame = data[ticker].dropna(how='all') if ticker in data.columns.levels[0] else None
+            else:
+                # Single-ticker downloads may come back with flat columns
+                frame = data if len(tickers) == 1 else None
+            
+            # Generate sample data as last resort
+            results[ticker] = frame if frame is not None else self._sample_data()
+        return results
+    
+    def _fetch_one(self, ticker, use_s3):
+        """Fetch one ticker from S3 (if it has a file there) or fallback"""
+        # Try S3 first
+        if use_s3:
+            data = self._fetch_s3(ticker)
+            if data is not None:
                 return data
-        except Exception as e:
-            print(f"S3 fetch failed for {ticker}: {e}")
         
         # Fallback to Yahoo Finance
+        return self.get_many_fallback([ticker])[ticker]
+    
+    @staticmethod
+    def _sample_data():
+        """Random-walk daily bars used when no data source is reachable"""
+        dates = pd.date_range(end=datetime.now(), periods=30, freq='D')
+        rng = np.random.default_rng()
+        
+        # One draw and one cumsum for all four price columns
+        ohlc = rng.standard_normal((30, 4)).cumsum(axis=0) + _SAMPLE_OFFSETS
+        data = pd.DataFrame(ohlc, columns=['Open', 'High', 'Low', 'Close'], index=dates)
+        data['Volume'] = rng.integers(1000000, 10000000, 30)
+        return data
+    
+    def _fetch_s3(self, ticker):
+        """Fetch daily bars for a ticker from the local cache or S3, or None if that fails"""
+        cached, age = self._load_cached_bars(ticker)
+        if cached is not None and age < CONFIG.BAR_CACHE_MAX_AGE:
+            return cached
+        
+        request = {'Bucket': self.s3_config['bucket'], 'Key': self._s3_key(ticker)}
+        if cached is not None:
+            # Let S3 answer 304 instead of resending a file we already have
+            request['IfModifiedSince'] = datetime.now(timezone.utc) - timedelta(seconds=age)
+        
         try:
-            import yfinance as yf
-            data = yf.download(ticker, period="1mo", interval="1d")
-            return data
-        except:
-            # Generate sample data as last resort
-            dates = pd.date_range(end=datetime.now(), periods=30, freq='D')
-            data = pd.DataFrame({
-                'Open': np.random.randn(30).cumsum() + 100,
-                'High': np.random.randn(30).cumsum() + 105,
-                'Low': np.random.randn(30).cumsum() + 95,
-                'Close': np.random.randn(30).cumsum() + 100,
-                'Volume': np.random.randint(1000000, 10000000, 30)
-            }, index=dates)
+            with self._fetch_slots:
+                self._rate_limit.acquire()
+                try:
+                    response = self.s3_client.get_object(**request)
+                except Exception as e:
+                    if cached is not None and self._is_not_modified(e):
+                        # Still current - restart the cache's max-age clock
+                        os.utime(self._bar_cache_path(ticker))
+                        return cached
+                    if self._is_missing(e):
+                        # No daily file for this ticker - not worth a warning
+                        return cached
+                    raise
+                # Drain the (small) body first so the connection returns to the pool
+                raw = response['Body'].read()
+            data = _read_bars_csv(raw)
+            
+            if cached is not None and isinstance(data.index, pd.DatetimeIndex):
+                # Past bars never change - keep our history and append the new tail
+                data = pd.concat([cached, data[data.index > cached.index[-1]]])
+            self._store_cached_bars(ticker, data)
             return data
+        except Exception as e:
+            logger.warning("S3 fetch failed for %s: %s", ticker, e)
+            return cached
+    
+    @staticmethod
+    def _bar_cache_path(ticker):
+        return os.path.join(CONFIG.BAR_CACHE_DIR, f"{ticker.upper()}.parquet")
+    
+    def _has_fresh_cache(self, ticker):
+        """True if the parquet cache can be served without asking S3"""
+        try:
+            age = time.time() - os.path.getmtime(self._bar_cache_path(ticker))
+        except OSError:
+            return False
+        return PYARROW_AVAILABLE and age < CONFIG.BAR_CACHE_MAX_AGE
+    
+    def _load_cached_bars(self, ticker):
+        """Return (bars, age in seconds) from the parquet cache, or (None, None)"""
+        path = self._bar_cache_path(ticker)
+        if not PYARROW_AVAILABLE or not os.path.exists(path):
+            return None, None
+        
+        try:
+            age = time.time() - os.path.getmtime(path)
+            return pd.read_parquet(path, engine='pyarrow'), age
+        except Exception as e:
+            logger.warning("Bar cache read failed for %s: %s", ticker, e)
+            return None, None
+    
+    def _store_cached_bars(self, ticker, data):
+        """Write bars to the parquet cache"""
+        if not PYARROW_AVAILABLE or not isinstance(data.index, pd.DatetimeIndex):
+            return
+        
+        try:
+            _atomic_write(self._bar_cache_path(ticker), lambda tmp_path: data.to_parquet(tmp_path, engine='pyarrow'))
+        except Exception as e:
+            logger.warning("Bar cache write failed for %s: %s", ticker, e)
+    
+    @staticmethod
+    def _is_not_modified(error):
+        """True if a boto3 error is S3's 304 reply to IfModifiedSince"""
+        code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+        return code in ('304', 'NotModified')
+    
+    @staticmethod
+    def _is_missing(error):
+        """True if a boto3 error says the key doesn't exist"""
+        code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+        return code in ('404', 'NoSuchKey')
+    
+    @staticmethod
+    def _s3_key(ticker):
+        # Example S3 key - adjust based on your S3 structure
+        return f"stocks/{ticker.upper()}/daily.csv"
     
     def get_real_time_quote(self, ticker):
         """Get real-time quote"""
+        return self.get_real_time_quotes([ticker])[ticker]
+    
+    def get_real_time_quotes(self, tickers):
+        """Get real-time quotes for many tickers with one batched download"""
+        tickers = list(tickers)
+        quotes = {}
+        
         try:
             import yfinance as yf
-            stock = yf.Ticker(ticker)
-            data = stock.history(period='1d', interval='1m')
+            with self._fetch_slots:
+                self._rate_limit.acquire()
+                data = yf.download(
+                    " ".join(tickers),
+                    period='1d',
+                    interval='1m',
+                    group_by='ticker',
+                    threads=True,
+                    progress=False
+                )
             
-            if not data.empty:
-                return {
-                    'price': float(data['Close'].iloc[-1]),
-                    'volume': int(data['Volume'].iloc[-1]),
-                    'timestamp': datetime.now(),
-                    'source': 'yfinance'
-                }
+            for ticker in tickers:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if ticker not in data.columns.levels[0]:
+                        continue
+                    bars = data[ticker].dropna(how='all')
+                elif len(tickers) == 1:
+                    bars = data
+                else:
+                    continue
+                
+                if not bars.empty:
+                    quotes[ticker] = {
+                        'price': float(bars['Close'].iloc[-1]),
+                        'volume': int(bars['Volume'].iloc[-1]),
+                        'timestamp': datetime.now(),
+                        'source': 'yfinance'
+                    }
         except:
             pass
         
         # Fallback
-        return {
-            'price': 100.00,
-            'volume': 1000000,
-            'timestamp': datetime.now(),
-            'source': 'fallback'
-        }
+        for ticker in tickers:
+            if ticker not in quotes:
+                quotes[ticker] = {
+                    'price': 100.00,
+                    'volume': 1000000,
+                    'timestamp': datetime.now(),
+                    'source': 'fallback'
+                }
+        return quotes
+
+def _read_bars_csv(raw):
+    """Parse a CSV payload into a DataFrame indexed by timestamp (when present)"""
+    header = raw.split(b'\n', 1)[0].decode('utf-8', errors='ignore')
+    has_timestamp = 'timestamp' in [name.strip().strip('"') for name in header.split(',')]
+    
+    if PYARROW_AVAILABLE:
+        # Typed at parse time, so no second to_datetime pass over the column
+        options = pacsv.ConvertOptions(column_types={'timestamp': pa.timestamp('ns')})
+        data = pacsv.read_csv(io.BytesIO(raw), convert_options=options).to_pandas()
+        if has_timestamp:
+            data.set_index('timestamp', inplace=True)
+        return data
+    
+    if has_timestamp:
+        return pd.read_csv(io.BytesIO(raw), parse_dates=['timestamp'], index_col='timestamp')
+    return pd.read_csv(io.BytesIO(raw))
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_market_data(_engine, ticker):
+    """Cached single-ticker fetch - Streamlit only hashes the ticker"""
+    return _engine._fetch_one(ticker, _engine.boto3_available)
 
 # ============================================================================
 # ABSOLUTE BEST SCANNER
@@ -173,61 +446,91 @@ class LiveDataEngine:
 class AbsoluteBestScanner:
     """Find absolute best trading opportunities"""
     
+    # Priority watchlist
+    PRIORITY_TICKERS = (
+        'NVDA', 'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'TSLA',
+        'AMD', 'AVGO', 'TSM', 'INTC', 'QCOM', 'COIN', 'PLTR',
+        'SNOW', 'CRWD', 'NET', 'DDOG', 'SQ', 'SHOP', 'UBER'
+    )
+    SCAN_SIZE = 15
+    LOOKBACK = 20
+    
+    # Score thresholds
+    MIN_SCORE = 75
+    VERY_HIGH_SCORE = 85
+    
     def __init__(self, data_engine):
         self.data_engine = data_engine
-        
-        # Priority watchlist
-        self.priority_tickers = [
-            'NVDA', 'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'TSLA',
-            'AMD', 'AVGO', 'TSM', 'INTC', 'QCOM', 'COIN', 'PLTR',
-            'SNOW', 'CRWD', 'NET', 'DDOG', 'SQ', 'SHOP', 'UBER'
-        ]
     
     def scan_best_opportunities(self, max_results=5):
         """Scan for best opportunities"""
+        return self._run_scan(self.PRIORITY_TICKERS[:self.SCAN_SIZE], max_results)
+    
+    def _run_scan(self, tickers, max_results):
+        """Fetch, score and rank the given tickers"""
         
-        results = []
+        # Fetch every ticker up front in one batch
+        market_data = self.data_engine.get_many(tickers)
         
-        for ticker in self.priority_tickers[:15]:
+        # Extract raw arrays once per ticker
+        arrays = {}
+        for ticker in tickers:
+            data = market_data.get(ticker)
             try:
-                data = self.data_engine.get_market_data(ticker)
-                
                 if data is not None and not data.empty:
-                    analysis = self._analyze_stock(ticker, data)
-                    
-                    if analysis['score'] >= 75:
-                        analysis['trade_plan'] = self._generate_trade_plan(analysis)
-                        results.append(analysis)
-                
-                time.sleep(0.1)  # Rate limiting
-                
+                    arrays[ticker] = self._extract_arrays(data)
             except Exception as e:
                 continue
         
-        # Sort by score
-        results.sort(key=lambda x: x['score'], reverse=True)
-        return results[:max_results]
-    
-    def _analyze_stock(self, ticker, data):
-        """Deep stock analysis"""
+        # Score every ticker in one parallel pass (numba-compiled when available)
+        names = list(arrays)
+        close_tails, close_lengths = stack_tails([close for close, _ in arrays.values()], self.LOOKBACK)
+        volume_tails, volume_lengths = stack_tails([volume for _, volume in arrays.values()], self.LOOKBACK)
+        batch = analyze_batch(close_tails, close_lengths, volume_tails, volume_lengths)
+        scores, momentum_scores, volume_scores, trend_scores = batch.T
         
-        if data.empty:
-            return {'ticker': ticker, 'score': 0}
+        # Top-k of the qualifying tickers, best first
+        candidates = np.flatnonzero(scores >= self.MIN_SCORE)
+        k = min(max_results, candidates.size)
+        if k == 0:
+            return []
+        # Ties keep universe order, as the old sort_values did
+        top = candidates[np.lexsort((candidates, -scores[candidates]))[:k]]
         
-        current_price = float(data['Close'].iloc[-1]) if 'Close' in data.columns else 100
+        # Only the winners get a result dict and a trade plan
+        results = []
+        for i in top:
+            analysis = self._analyze_stock(
+                names[i], arrays[names[i]][0], float(scores[i]),
+                float(momentum_scores[i]), float(volume_scores[i]), float(trend_scores[i])
+            )
+            analysis['trade_plan'] = self._generate_trade_plan(analysis)
+            results.append(analysis)
+        
+        return results
+    
+    @staticmethod
+    def _extract_arrays(data):
+        """Pull float64 close/volume arrays out of a price frame"""
+        # Resolve both columns in a single schema lookup
+        close_at, volume_at = data.columns.get_indexer(['Close', 'Volume'])
+        if close_at < 0:
+            raise KeyError('Close')
         
-        # Calculate scores
-        momentum_score = self._calculate_momentum(data)
-        volume_score = self._calculate_volume(data)
-        trend_score = self._calculate_trend(data)
+        close = data.iloc[:, close_at].to_numpy(dtype=np.float64)
+        volume = (data.iloc[:, volume_at].to_numpy(dtype=np.float64)
+                  if volume_at >= 0 else np.empty(0))
+        return close, volume
+    
+    def _analyze_stock(self, ticker, close, total_score, momentum_score, volume_score, trend_score):
+        """Build the result entry for a scored stock"""
         
-        # Total score
-        total_score = (momentum_score * 0.4 + volume_score * 0.3 + trend_score * 0.3)
+        current_price = float(close[-1])
         
         # Determine trend
-        if len(data) >= 2:
-            price_change = ((data['Close'].iloc[-1] - data['Close'].iloc[-2]) / 
-                           data['Close'].iloc[-2]) * 100
+        price_change = 0
+        if len(close) >= 2:
+            price_change = float((close[-1] - close[-2]) / close[-2] * 100)
             trend = "BULLISH" if price_change > 0 else "BEARISH"
         else:
             trend = "NEUTRAL"
@@ -235,7 +538,7 @@ class AbsoluteBestScanner:
         return {
             'ticker': ticker,
             'price': current_price,
-            'price_change': price_change if len(data) >= 2 else 0,
+            'price_change': price_change,
             'trend': trend,
             'score': total_score,
             'momentum_score': momentum_score,
@@ -243,87 +546,27 @@ class AbsoluteBestScanner:
             'trend_score': trend_score
         }
     
-    def _calculate_momentum(self, data):
-        """Calculate momentum score"""
-        if len(data) < 10:
-            return 50
-        
-        recent_change = ((data['Close'].iloc[-1] - data['Close'].iloc[-5]) / 
-                        data['Close'].iloc[-5]) * 100 if len(data) >= 5 else 0
-        
-        momentum = 50 + recent_change * 2
-        return max(0, min(100, momentum))
-    
-    def _calculate_volume(self, data):
-        """Calculate volume score"""
-        if len(data) < 10 or 'Volume' not in data.columns:
-            return 50
-        
-        recent_volume = data['Volume'].iloc[-5:].mean()
-        avg_volume = data['Volume'].iloc[-20:].mean() if len(data) >= 20 else recent_volume
-        
-        if avg_volume == 0:
-            return 50
-        
-        volume_ratio = recent_volume / avg_volume
-        
-        if volume_ratio > 2:
-            return 90
-        elif volume_ratio > 1.5:
-            return 75
-        elif volume_ratio > 1:
-            return 60
-        else:
-            return 40
-    
-    def _calculate_trend(self, data):
-        """Calculate trend strength"""
-        if len(data) < 20:
-            return 50
-        
-        prices = data['Close'].values
-        ma_short = np.mean(prices[-10:])
-        ma_long = np.mean(prices[-20:])
-        
-        if prices[-1] > ma_short > ma_long:
-            return 85  # Strong uptrend
-        elif prices[-1] < ma_short < ma_long:
-            return 15  # Strong downtrend
-        else:
-            return 50  # Sideways
-    
     def _generate_trade_plan(self, analysis):
         """Generate detailed trade plan"""
-        ticker = analysis['ticker']
         current_price = analysis['price']
         score = analysis['score']
-        trend = analysis['trend']
-        
-        if trend == "BULLISH":
-            direction = "LONG"
-            entry = current_price
-            stop_loss = current_price * 0.93
-            target = current_price * 1.21
-        else:
-            direction = "SHORT"
-            entry = current_price
-            stop_loss = current_price * 1.07
-            target = current_price * 0.79
-        
-        risk = abs(entry - stop_loss)
-        reward = abs(target - entry)
-        risk_reward = reward / risk if risk > 0 else 0
         
         # Confidence level
-        if score >= 85:
+        if score >= self.VERY_HIGH_SCORE:
             confidence = "VERY HIGH"
-            position = "10-15%"
-        elif score >= 75:
+        elif score >= self.MIN_SCORE:
             confidence = "HIGH"
-            position = "7-10%"
         else:
             confidence = "MODERATE"
-            position = "5-7%"
+        direction, stop_mult, target_mult, position = _PLAN_TABLE[(analysis['trend'] == "BULLISH", confidence)]
+        
+        entry = current_price
+        stop_loss = current_price * stop_mult
+        target = current_price * target_mult
+        
+        risk = abs(entry - stop_loss)
+        reward = abs(target - entry)
+        risk_reward = reward / risk if risk > 0 else 0
         
         return {
             'direction': direction,
@@ -336,31 +579,210 @@ class AbsoluteBestScanner:
             'confidence': confidence
         }
 
+# (is bullish, confidence) -> (direction, stop multiplier, target multiplier, position size)
+_PLAN_TABLE = {
+    (True, "VERY HIGH"): ("LONG", 0.93, 1.21, "10-15%"),
+    (True, "HIGH"): ("LONG", 0.93, 1.21, "7-10%"),
+    (True, "MODERATE"): ("LONG", 0.93, 1.21, "5-7%"),
+    (False, "VERY HIGH"): ("SHORT", 1.07, 0.79, "10-15%"),
+    (False, "HIGH"): ("SHORT", 1.07, 0.79, "7-10%"),
+    (False, "MODERATE"): ("SHORT", 1.07, 0.79, "5-7%"),
+}
+
+@st.cache_resource(show_spinner=False)
+def get_data_engine():
+    """One LiveDataEngine per process, shared by every session and rerun"""
+    return LiveDataEngine()
+
+@st.cache_resource(show_spinner=False)
+def get_scanner(_engine):
+    """One AbsoluteBestScanner per engine - the engine itself isn't hashed"""
+    return AbsoluteBestScanner(_engine)
+
+def _scan_cache_path(max_picks):
+    return os.path.join(CONFIG.SCAN_CACHE_DIR, f"scan_{int(max_picks)}.pkl")
+
+def _load_saved_scan(max_picks):
+    """Picks from the on-disk scan snapshot if it is recent enough, else None"""
+    path = _scan_cache_path(max_picks)
+    try:
+        if time.time() - os.path.getmtime(path) >= CONFIG.SCAN_CACHE_MAX_AGE:
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Scan cache read failed: %s", e)
+        return None
+
+def _save_scan(max_picks, picks):
+    """Overwrite the scan snapshot for max_picks"""
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            pickle.dump(picks, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    try:
+        _atomic_write(_scan_cache_path(max_picks), write)
+    except Exception as e:
+        logger.warning("Scan cache write failed: %s", e)
+
+# Shared in memory for a minute. The snapshot on disk (one file per max_picks)
+# lets a restarted server reuse a scan that is still under a minute old
+@st.cache_data(ttl=CONFIG.SCAN_CACHE_MAX_AGE, max_entries=32, show_spinner=False)
+def _cached_scan(max_picks):
+    """Scan shared by every session for up to a minute"""
+    picks = _load_saved_scan(max_picks)
+    if picks is None:
+        picks = get_scanner(get_data_engine()).scan_best_opportunities(max_picks)
+        _save_scan(max_picks, picks)
+    return picks
+
+# ============================================================================
+# CACHED READS
+# ============================================================================
+def _current_user():
+    """Authenticated user, looked up once per rerun at the top of main()"""
+    return st.session_state.get("_user_cache")
+
+# Short TTLs bound staleness; call e.g. _user_trades.clear() after a write
+@st.cache_data(ttl=30, show_spinner=False)
+def _user_portfolios(user_id):
+    """Cached db.get_user_portfolios"""
+    return db.get_user_portfolios(user_id)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _user_watchlist(user_id):
+    """Cached db.get_watchlist"""
+    return db.get_watchlist(user_id)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _user_trades(user_id, limit=50):
+    """Cached db.get_recent_trades"""
+    return db.get_recent_trades(user_id, limit=limit)
+
+@st.cache_data(ttl=15, show_spinner=False)
+def _cached_quotes(tickers, bucket):
+    """Watchlist quotes shared by every session within the same 15s bucket"""
+    return get_data_engine().get_real_time_quotes(tickers)
+
+@st.cache_data(show_spinner=False)
+def _plan_info(tier):
+    """Cached subscription.get_user_plan_info - plans are static per tier"""
+    return subscription.get_user_plan_info(tier)
+
+# ============================================================================
+# STATIC HTML / CSS
+# ============================================================================
+# Global app styles (minified - sent on every rerun)
+_APP_CSS = (
+    "<style>"
+    ".stApp{background:#0A0A0A;color:white}"
+    ".stButton>button{background:linear-gradient(135deg,#00FF88,#00CCFF);color:black;"
+    "font-weight:bold;border:none;border-radius:10px;padding:10px 20px}"
+    ".stButton>button:hover{transform:translateY(-2px);box-shadow:0 5px 15px rgba(0,255,136,0.3)}"
+    "</style>"
+)
+
+_LOGIN_CSS = """
+    <style>
+    .login-container {
+        max-width: 400px;
+        margin: 50px auto;
+        padding: 40px;
+        background: rgba(15, 15, 20, 0.97);
+        border-radius: 20px;
+        border: 1px solid rgba(0, 255, 136, 0.3);
+        box-shadow: 0 20px 40px rgba(0, 255, 136, 0.1);
+    }
+    </style>
+    """
+_LOGIN_TITLE_HTML = '<h1 style="text-align: center; color: #00FF88;">⚡ OMNISCIENT ONE</h1>'
+_LOGIN_SUBTITLE_HTML = '<p style="text-align: center; color: #888; margin-bottom: 30px;">Professional Trading Platform</p>'
+
+_HEADER_TITLE_HTML = f'<h1 style="color: {CONFIG.NEON_GREEN}; margin: 0;">{CONFIG.PLATFORM_NAME}</h1>'
+_HEADER_CAPTION = f"{CONFIG.VERSION} • Professional Trading Platform"
+
+# Static halves of the header clock card - only the time is filled in
+_HEADER_CLOCK_PREFIX = '''
+            <div style="padding: 10px; border-radius: 10px; background: rgba(255,255,255,0.05); border: 1px solid rgba(0,255,136,0.2);">
+                <div style="color: #00FF88; font-size: 18px; font-weight: 600;">'''
+_HEADER_CLOCK_SUFFIX = ''' EST</div>
+                <div style="color: #888; font-size: 11px;">LIVE TRADING</div>
+            </div>
+        '''
+
+# Static pieces of the sidebar portfolio card
+_STATS_CARD_PREFIX = """
+                <div style="padding: 10px; border-radius: 8px; background: rgba(0, 255, 136, 0.1); margin: 10px 0;">
+                    <div style="color: #888; font-size: 12px;">Total Portfolio</div>
+                    <div style="color: white; font-size: 24px; font-weight: bold;">"""
+_STATS_CARD_MIDDLE = """</div>
+                    <div style="color: #888; font-size: 12px;">"""
+_STATS_CARD_SUFFIX = """ recent trades</div>
+                </div>
+                """
+
+# (icon, title, page key) for the sidebar navigation - the key doubles as URL path
+_NAV_PAGES = (
+    ("📊", "Dashboard", "dashboard"),
+    ("🏆", "Absolute Best Scanner", "scanner"),
+    ("🤖", "AI Predictor", "ai_predictor"),
+    ("💼", "Portfolio", "portfolio"),
+    ("🐋", "Whale Detection", "whale"),
+    ("📈", "Technical Analysis", "technical"),
+    ("🧠", "Market Narratives", "narratives"),
+    ("⭐", "Watchlist", "watchlist"),
+    ("👤", "Profile", "profile"),
+    ("💎", "Subscription", "subscription"),
+    ("⚙️", "Settings", "settings")
+)
+
+# (name, price, features) for the public pricing table
+_PRICING_PLANS = (
+    ("🆓 Free", "$0", ("Basic Scanner", "Delayed Data", "5 Stock Watchlist")),
+    ("🥈 Basic", "$29.99", ("Real-time Data", "AI Predictions", "Unlimited Watchlist")),
+    ("🥇 Premium", "$99.99", ("Advanced AI", "Trade Signals", "Portfolio Tools", "API Access")),
+    ("⚡ Ultimate", "$199.99", ("Automated Trading", "Institutional Data", "Dedicated Support"))
+)
+
+# (plan id, name, monthly price, features) for the subscription page
+_SUBSCRIPTION_PLANS = (
+    ("free", "🆓 Free", "0", ("Basic Scanner", "Delayed Data")),
+    ("basic", "🥈 Basic", "29.99", ("Real-time Data", "AI Predictions")),
+    ("premium", "🥇 Premium", "99.99", ("Trade Signals", "Portfolio Tools", "API Access")),
+    ("ultimate", "⚡ Ultimate", "199.99", ("Automated Trading", "Institutional Data", "Dedicated Support"))
+)
+
+# Accent colors by subscription tier and trade direction
+_TIER_COLORS = {"FREE": "#888", "BASIC": "#00CCFF", "PREMIUM": "#FFD700", "ULTIMATE": "#FF00AA"}
+_DIRECTION_COLORS = {"LONG": "#00FF88", "SHORT": "#FF00AA"}
+
 # ============================================================================
 # UI COMPONENTS WITH MODULES INTEGRATION
 # ============================================================================
+@st.fragment(run_every="1s")
+def _clock_fragment():
+    """Header clock - ticks on its own without rerunning the app"""
+    current_time = datetime.now().strftime("%H:%M:%S")
+    st.markdown(f'{_HEADER_CLOCK_PREFIX}{current_time}{_HEADER_CLOCK_SUFFIX}', unsafe_allow_html=True)
+
 def render_header():
     """Render platform header"""
     col1, col2, col3 = st.columns([3, 1, 1])
     
     with col1:
-        st.markdown(f'<h1 style="color: {CONFIG.NEON_GREEN}; margin: 0;">{CONFIG.PLATFORM_NAME}</h1>', unsafe_allow_html=True)
-        st.caption(f"{CONFIG.VERSION} • Professional Trading Platform")
+        st.markdown(_HEADER_TITLE_HTML, unsafe_allow_html=True)
+        st.caption(_HEADER_CAPTION)
     
     with col2:
-        current_time = datetime.now().strftime("%H:%M:%S")
-        st.markdown(f'''
-            <div style="padding: 10px; border-radius: 10px; background: rgba(255,255,255,0.05); border: 1px solid rgba(0,255,136,0.2);">
-                <div style="color: #00FF88; font-size: 18px; font-weight: 600;">{current_time} EST</div>
-                <div style="color: #888; font-size: 11px;">LIVE TRADING</div>
-            </div>
-        ''', unsafe_allow_html=True)
+        _clock_fragment()
     
     with col3:
-        if auth and auth.get_current_user():
-            user = auth.get_current_user()
+        user = _current_user()
+        if user:
             tier = user.get('subscription_tier', 'free').upper()
-            color = {"FREE": "#888", "BASIC": "#00CCFF", "PREMIUM": "#FFD700", "ULTIMATE": "#FF00AA"}.get(tier, "#888")
+            color = _TIER_COLORS.get(tier, "#888")
             st.markdown(f'''
                 <div style="padding: 10px; border-radius: 10px; background: rgba(255,255,255,0.05); border: 1px solid {color};">
                     <div style="color: {color}; font-size: 16px; font-weight: 600;">{tier} TIER</div>
@@ -371,25 +793,13 @@ def render_header():
 def render_login_page():
     """Render login/registration page"""
     
-    st.markdown("""
-    <style>
-    .login-container {
-        max-width: 400px;
-        margin: 50px auto;
-        padding: 40px;
-        background: rgba(15, 15, 20, 0.97);
-        border-radius: 20px;
-        border: 1px solid rgba(0, 255, 136, 0.3);
-        box-shadow: 0 20px 40px rgba(0, 255, 136, 0.1);
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(_LOGIN_CSS, unsafe_allow_html=True)
     
     st.markdown('<div class="login-container">', unsafe_allow_html=True)
     
     # Platform Header
-    st.markdown('<h1 style="text-align: center; color: #00FF88;">⚡ OMNISCIENT ONE</h1>', unsafe_allow_html=True)
-    st.markdown('<p style="text-align: center; color: #888; margin-bottom: 30px;">Professional Trading Platform</p>', unsafe_allow_html=True)
+    st.markdown(_LOGIN_TITLE_HTML, unsafe_allow_html=True)
+    st.markdown(_LOGIN_SUBTITLE_HTML, unsafe_allow_html=True)
     
     # Tabs
     tab1, tab2 = st.tabs(["🔐 Login", "📝 Register"])
@@ -404,8 +814,7 @@ def render_login_page():
                     if MODULES_AVAILABLE and auth:
                         result = auth.authenticate_user(username, password)
                         if result["success"]:
-                            st.success("Login successful!")
-                            time.sleep(1)
+                            st.toast("Login successful!", icon="✅")
                             st.rerun()
                         else:
                             st.error(result["error"])
@@ -418,8 +827,7 @@ def render_login_page():
                             "tier": "premium" if username == "admin" else "free"
                         }
                         st.session_state.subscription_tier = st.session_state.user["tier"]
-                        st.success("Login successful! (Demo mode)")
-                        time.sleep(1)
+                        st.toast("Login successful! (Demo mode)", icon="✅")
                         st.rerun()
                 else:
                     st.error("Please enter credentials")
@@ -445,8 +853,7 @@ def render_login_page():
                     if MODULES_AVAILABLE and auth:
                         result = auth.create_user(email, username, password)
                         if result["success"]:
-                            st.success("Account created! 14-day premium trial activated.")
-                            time.sleep(2)
+                            st.toast("Account created! 14-day premium trial activated.", icon="✅")
                             st.rerun()
                         else:
                             st.error(result["error"])
@@ -459,8 +866,7 @@ def render_login_page():
                             "tier": "free"
                         }
                         st.session_state.subscription_tier = "free"
-                        st.success("Account created! (Demo mode)")
-                        time.sleep(2)
+                        st.toast("Account created! (Demo mode)", icon="✅")
                         st.rerun()
     
     st.markdown('</div>', unsafe_allow_html=True)
@@ -475,19 +881,11 @@ def render_pricing_table():
     
     col1, col2, col3, col4 = st.columns(4)
     
-    plans = [
-        ("🆓 Free", "$0", ["Basic Scanner", "Delayed Data", "5 Stock Watchlist"]),
-        ("🥈 Basic", "$29.99", ["Real-time Data", "AI Predictions", "Unlimited Watchlist"]),
-        ("🥇 Premium", "$99.99", ["Advanced AI", "Trade Signals", "Portfolio Tools", "API Access"]),
-        ("⚡ Ultimate", "$199.99", ["Automated Trading", "Institutional Data", "Dedicated Support"])
-    ]
-    
-    for i, (name, price, features) in enumerate(plans):
+    for i, (name, price, features) in enumerate(_PRICING_PLANS):
         with [col1, col2, col3, col4][i]:
-            st.markdown(f"#### {name}")
-            st.markdown(f"**{price}/month**")
-            for feature in features:
-                st.markdown(f"✓ {feature}")
+            # One markdown element per card instead of one per line
+            feature_lines = "  \n".join(f"✓ {feature}" for feature in features)
+            st.markdown(f"#### {name}\n\n**{price}/month**\n\n{feature_lines}")
             if st.button(f"Select {name.split()[0]}", key=f"plan_{i}", use_container_width=True):
                 st.info(f"Selected {name} plan")
 
@@ -497,17 +895,17 @@ def render_user_profile():
         st.info("User profile features require module loading")
         return
     
-    user = auth.get_current_user()
+    user = _current_user()
     
     if user:
         # Get user's subscription info
-        plan_info = subscription.get_user_plan_info(user["subscription_tier"])
+        plan_info = _plan_info(user["subscription_tier"])
         
         # Get user's portfolio
-        portfolios = db.get_user_portfolios(user["user_id"])
+        portfolios = _user_portfolios(user["user_id"])
         
         # Get user's watchlist
-        watchlist = db.get_watchlist(user["user_id"])
+        watchlist = _user_watchlist(user["user_id"])
         
         # Render UI with this data
         col1, col2 = st.columns([2, 1])
@@ -531,7 +929,7 @@ def render_user_profile():
             st.markdown("### 📊 Quick Stats")
             
             # Get recent trades
-            trades = db.get_user_trades(user["user_id"], limit=5)
+            trades = _user_trades(user["user_id"], limit=5)
             if trades:
                 st.markdown("**Recent Trades:**")
                 for trade in trades:
@@ -543,8 +941,8 @@ def render_user_profile():
     else:
         st.warning("Please login to view profile")
 
-def render_dashboard(data_engine):
-    """Main dashboard"""
+def render_dashboard(data_engine, pages):
+    """Main dashboard (pages: this run's key -> st.Page, for the quick-action links)"""
     st.markdown("## 📊 LIVE TRADING DASHBOARD")
     
     # Market overview
@@ -568,28 +966,48 @@ def render_dashboard(data_engine):
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         if st.button("🔄 Refresh Data", use_container_width=True):
+            # Drop the 30s per-user caches so the rerun reads fresh rows
+            _user_portfolios.clear()
+            _user_watchlist.clear()
+            _user_trades.clear()
             st.rerun()
     with col2:
         if st.button("🤖 AI Analysis", use_container_width=True):
-            st.session_state.page = "ai_predictor"
-            st.rerun()
+            st.switch_page(pages["ai_predictor"])
     with col3:
         if st.button("💰 Trade Ideas", use_container_width=True):
-            st.session_state.page = "money_makers"
-            st.rerun()
+            st.switch_page(pages["scanner"])
     with col4:
         if st.button("📈 Technical", use_container_width=True):
-            st.session_state.page = "technical"
-            st.rerun()
+            st.switch_page(pages["technical"])
+
+# (label, pick field, bar color) for the per-pick score bars
+_SCORE_BARS = (
+    ("Momentum", "momentum_score", "#00FF88"),
+    ("Volume", "volume_score", "#00CCFF"),
+    ("Trend", "trend_score", "#FFD700")
+)
+
+def _score_bar_html(name, score, color):
+    """One labelled score bar"""
+    return (
+        f'<div style="margin: 8px 0;">'
+        f'<div style="display: flex; justify-content: space-between; margin-bottom: 4px;">'
+        f'<span style="color: #888; font-size: 12px;">{name}</span>'
+        f'<span style="color: white; font-size: 12px; font-weight: bold;">{score:.0f}/100</span>'
+        f'</div>'
+        f'<div style="width: 100%; height: 8px; background: rgba(255,255,255,0.1); border-radius: 4px; overflow: hidden;">'
+        f'<div style="width: {score}%; height: 100%; background: {color}; border-radius: 4px;"></div>'
+        f'</div>'
+        f'</div>'
+    )
 
-def render_absolute_best_scanner(data_engine):
-    """Absolute Best Scanner"""
+@st.fragment
+def render_absolute_best_scanner():
+    """Absolute Best Scanner - a fragment, so scanning doesn't rerun the whole app"""
     st.markdown("## 🏆 **ABSOLUTE BEST SCANNER**")
     st.markdown("### Real-time scanning for maximum profit opportunities")
     
-    # Initialize scanner
-    scanner = AbsoluteBestScanner(data_engine)
-    
     # Controls
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -600,18 +1018,21 @@ def render_absolute_best_scanner(data_engine):
     with col3:
         max_picks = st.slider("Max Picks", 1, 10, 3)
     
-    # Show last scan time
-    if 'last_scan_time' in st.session_state:
-        st.caption(f"Last scan: {st.session_state.last_scan_time}")
-    
     # Start scan
     if st.session_state.get('scan_in_progress', False):
-        with st.spinner("🚀 **SCANNING MARKETS FOR ABSOLUTE BEST OPPORTUNITIES...**"):
-            picks = scanner.scan_best_opportunities(max_picks)
-            st.session_state.scan_results = picks
-            st.session_state.last_scan_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # Results render just below in this same run; the finally keeps a failed
+        # scan from leaving the flag set for the next full rerun
+        try:
+            with st.spinner("🚀 **SCANNING MARKETS FOR ABSOLUTE BEST OPPORTUNITIES...**"):
+                picks = _cached_scan(max_picks)
+                st.session_state.scan_results = picks
+                st.session_state.last_scan_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        finally:
             st.session_state.scan_in_progress = False
-            st.rerun()
+    
+    # Show last scan time (after the scan, so a new one shows up in this run)
+    if 'last_scan_time' in st.session_state:
+        st.caption(f"Last scan: {st.session_state.last_scan_time}")
     
     # Display results
     if 'scan_results' in st.session_state:
@@ -665,33 +1086,18 @@ def render_absolute_best_scanner(data_engine):
                     col1, col2 = st.columns([2, 1])
                     
                     with col1:
-                        # Analysis scores
-                        st.markdown("#### 📊 Analysis Scores")
-                        
-                        scores = [
-                            ("Momentum", pick['momentum_score'], "#00FF88"),
-                            ("Volume", pick['volume_score'], "#00CCFF"),
-                            ("Trend", pick['trend_score'], "#FFD700")
-                        ]
-                        
-                        for name, score, color in scores:
-                            st.markdown(f"""
-                            <div style="margin: 8px 0;">
-                                <div style="display: flex; justify-content: space-between; margin-bottom: 4px;">
-                                    <span style="color: #888; font-size: 12px;">{name}</span>
-                                    <span style="color: white; font-size: 12px; font-weight: bold;">{score:.0f}/100</span>
-                                </div>
-                                <div style="width: 100%; height: 8px; background: rgba(255,255,255,0.1); border-radius: 4px; overflow: hidden;">
-                                    <div style="width: {score}%; height: 100%; background: {color}; border-radius: 4px;"></div>
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
+                        # Analysis scores - heading and all bars in one element
+                        bars = "".join(
+                            _score_bar_html(name, pick[field], color)
+                            for name, field, color in _SCORE_BARS
+                        )
+                        st.markdown(f"#### 📊 Analysis Scores\n\n{bars}", unsafe_allow_html=True)
                     
                     with col2:
                         # Trade plan
                         trade_plan = pick.get('trade_plan', {})
                         if trade_plan:
-                            direction_color = "#00FF88" if trade_plan['direction'] == "LONG" else "#FF00AA"
+                            direction_color = _DIRECTION_COLORS.get(trade_plan['direction'], "#FF00AA")
                             
                             st.markdown(f"""
                             <div style="padding: 15px; border-radius: 10px; background: {direction_color}10; border: 1px solid {direction_color};">
@@ -709,10 +1115,10 @@ def render_subscription_page():
     
     # Get current user
     if MODULES_AVAILABLE and auth:
-        user = auth.get_current_user()
+        user = _current_user()
         if user:
             current_tier = user.get('subscription_tier', 'free')
-            plan_info = subscription.get_user_plan_info(current_tier)
+            plan_info = _plan_info(current_tier)
             
             st.info(f"**Current Plan:** {plan_info.get('name', 'Free')} Tier")
             
@@ -736,23 +1142,13 @@ def render_subscription_page():
     # Plans
     col1, col2, col3, col4 = st.columns(4)
     
-    plans = [
-        ("free", "🆓 Free", "0", ["Basic Scanner", "Delayed Data"]),
-        ("basic", "🥈 Basic", "29.99", ["Real-time Data", "AI Predictions"]),
-        ("premium", "🥇 Premium", "99.99", ["Trade Signals", "Portfolio Tools", "API Access"]),
-        ("ultimate", "⚡ Ultimate", "199.99", ["Automated Trading", "Institutional Data", "Dedicated Support"])
-    ]
-    
-    for i, (plan_id, name, price, features) in enumerate(plans):
+    for i, (plan_id, name, price, features) in enumerate(_SUBSCRIPTION_PLANS):
         with [col1, col2, col3, col4][i]:
-            st.markdown(f"### {name}")
-            st.markdown(f"**${price}/month**")
+            feature_lines = "  \n".join(f"✓ {feature}" for feature in features)
+            st.markdown(f"### {name}\n\n**${price}/month**\n\n{feature_lines}")
             
-            for feature in features:
-                st.markdown(f"✓ {feature}")
-            
-            if (MODULES_AVAILABLE and auth and user and current_tier == plan_id) or \
-               (not MODULES_AVAILABLE and current_tier == plan_id):
+            # Logged-out users already returned above, so current_tier is always set
+            if plan_id == current_tier:
                 st.success("Current Plan")
             elif st.button(f"Upgrade to {name}", key=f"upgrade_{plan_id}", use_container_width=True):
                 if plan_id in ["basic", "premium", "ultimate"]:
@@ -760,19 +1156,18 @@ def render_subscription_page():
                         # In production, this would redirect to Stripe
                         expiry = (datetime.now() + timedelta(days=30)).isoformat()
                         db.update_subscription(user["user_id"], plan_id, expiry)
-                        st.success(f"Upgraded to {name}!")
-                        time.sleep(1)
+                        st.toast(f"Upgraded to {name}!", icon="✅")
                         st.rerun()
                     else:
                         st.session_state.subscription_tier = plan_id
-                        st.success(f"Upgraded to {name}! (Demo mode)")
+                        st.toast(f"Upgraded to {name}! (Demo mode)", icon="✅")
                         st.rerun()
                 else:
                     if MODULES_AVAILABLE and auth and user:
                         db.update_subscription(user["user_id"], "free", "")
                     else:
                         st.session_state.subscription_tier = "free"
-                    st.info("Switched to Free plan")
+                    st.toast("Switched to Free plan")
                     st.rerun()
     
     # Yearly discount
@@ -793,14 +1188,124 @@ def render_subscription_page():
         st.markdown("~~$2,399.88~~ **$1,999.99/year**")
         st.markdown("*Save $399.89*")
 
+# ============================================================================
+# PAGE ROUTING
+# ============================================================================
+def _coming_soon_page(title, message):
+    """Build a renderer for a placeholder page"""
+    def render(data_engine, pages):
+        st.markdown(title)
+        st.info(message)
+    return render
+
+def render_portfolio_page(data_engine, pages):
+    """Portfolio page"""
+    st.markdown("## 💼 PORTFOLIO MANAGEMENT")
+    render_user_profile()
+
+def render_watchlist_page(data_engine, pages):
+    """Watchlist page with live quotes"""
+    st.markdown("## ⭐ WATCHLIST")
+    if MODULES_AVAILABLE and auth and db:
+        user = _current_user()
+        if user:
+            watchlist = _user_watchlist(user["user_id"])
+            if watchlist:
+                # One batched request for the whole list
+                quotes = _cached_quotes(tuple(watchlist), int(time.time() // 15))
+                for ticker in watchlist:
+                    with st.expander(f"{ticker}"):
+                        st.metric("Price", f"${quotes[ticker]['price']:.2f}")
+            else:
+                st.info("Your watchlist is empty. Add stocks from the scanner!")
+    else:
+        st.info("Watchlist requires database connection")
+
+def render_profile_page(data_engine, pages):
+    """Profile page"""
+    st.markdown("## 👤 USER PROFILE")
+    render_user_profile()
+
+def render_settings_page(data_engine, pages):
+    """Settings page"""
+    st.markdown("## ⚙️ SETTINGS")
+    
+    st.markdown("### API Configuration")
+    
+    # S3 Credentials
+    st.markdown("#### 📁 S3 Credentials (Read-only)")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.text_input("Access Key ID", CONFIG.S3_ACCESS_KEY, disabled=True)
+    with col2:
+        st.text_input("Secret Access Key", CONFIG.S3_SECRET_KEY, type="password", disabled=True)
+    
+    st.markdown("#### ⚡ Application Settings")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        theme = st.selectbox("Theme", ["Dark", "Light", "Auto"])
+        refresh_rate = st.select_slider("Data Refresh Rate", 
+                                      options=["15m", "30m", "1h", "2h", "4h"], 
+                                      value="30m")
+    with col2:
+        notifications = st.checkbox("Enable Notifications", value=True)
+        sound_alerts = st.checkbox("Sound Alerts", value=False)
+    
+    if st.button("💾 Save Settings", use_container_width=True):
+        st.success("Settings saved!")
+
+# page key -> renderer(data_engine, pages)
+_ROUTES = {
+    "dashboard": render_dashboard,
+    "scanner": lambda data_engine, pages: render_absolute_best_scanner(),
+    "ai_predictor": _coming_soon_page("## 🤖 AI PRICE PREDICTOR", "Real-time AI predictions coming soon!"),
+    "portfolio": render_portfolio_page,
+    "whale": _coming_soon_page("## 🐋 WHALE DETECTION", "Real-time whale detection coming soon!"),
+    "technical": _coming_soon_page("## 📈 TECHNICAL ANALYSIS", "Advanced technical analysis coming soon!"),
+    "narratives": _coming_soon_page("## 🧠 MARKET NARRATIVES", "AI-powered market narratives coming soon!"),
+    "watchlist": render_watchlist_page,
+    "profile": render_profile_page,
+    "subscription": lambda data_engine, pages: render_subscription_page(),
+    "settings": render_settings_page
+}
+
+def _build_page(icon, title, key, data_engine, pages):
+    """Wrap a route as an st.Page (pages are zero-argument callables)
+    
+    pages is the run's key -> st.Page dict, handed on so routes can st.switch_page
+    """
+    renderer = _ROUTES[key]
+    
+    def run():
+        renderer(data_engine, pages)
+    run.__name__ = key
+    
+    return st.Page(run, title=title, icon=icon, url_path=key, default=(key == "dashboard"))
+
 # ============================================================================
 # MAIN APPLICATION
 # ============================================================================
+# Initial session state for every new session
+_SESSION_DEFAULTS = {
+    'authenticated': False,
+    'user': None,
+    'subscription_tier': "free",
+    'scan_results': [],
+    'scan_in_progress': False
+}
+
+@st.cache_resource(show_spinner=False)
+def _ensure_data_dir():
+    """Create the data directory - cached so it only runs once per process"""
+    os.makedirs("data", exist_ok=True)
+    return True
+
 def main():
     """Main application entry point"""
     
-    # Create data directory if it doesn't exist
-    os.makedirs("data", exist_allow_html=True=True)
+    # Create data directory if it doesn't exist (once per process)
+    _ensure_data_dir()
     
     # Page configuration
     st.set_page_config(
@@ -810,106 +1315,60 @@ def main():
         initial_sidebar_state="expanded"
     )
     
-    # Custom CSS
-    st.markdown("""
-    <style>
-    .stApp {
-        background: #0A0A0A;
-        color: white;
-    }
-    .stButton>button {
-        background: linear-gradient(135deg, #00FF88, #00CCFF);
-        color: black;
-        font-weight: bold;
-        border: none;
-        border-radius: 10px;
-        padding: 10px 20px;
-    }
-    .stButton>button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 5px 15px rgba(0, 255, 136, 0.3);
-    }
-    </style>
-    """, unsafe_allow_html=True)
-    
-    # Initialize session state
-    if 'page' not in st.session_state:
-        st.session_state.page = 'dashboard'
-    if 'authenticated' not in st.session_state:
-        st.session_state.authenticated = False
-    if 'user' not in st.session_state:
-        st.session_state.user = None
-    if 'subscription_tier' not in st.session_state:
-        st.session_state.subscription_tier = "free"
-    if 'scan_results' not in st.session_state:
-        st.session_state.scan_results = []
-    if 'scan_in_progress' not in st.session_state:
-        st.session_state.scan_in_progress = False
-    
-    # Check authentication
-    if MODULES_AVAILABLE and auth:
-        current_user = auth.get_current_user()
-        if current_user:
-            st.session_state.authenticated = True
-            st.session_state.user = current_user
-            st.session_state.subscription_tier = current_user.get('subscription_tier', 'free')
+    # Custom CSS - Streamlit drops any element a rerun doesn't emit, so this
+    # can't be sent once per session; it's kept minified instead
+    st.markdown(_APP_CSS, unsafe_allow_html=True)
+    
+    # Initialize session state (copied so sessions never share a mutable default)
+    for key, value in _SESSION_DEFAULTS.items():
+        st.session_state.setdefault(key, copy.copy(value))
     
-    # Initialize data engine
-    data_engine = LiveDataEngine()
+    # Check authentication - resolved once here, renderers use _current_user()
+    current_user = auth.get_current_user() if MODULES_AVAILABLE and auth else None
+    st.session_state._user_cache = current_user
+    if current_user:
+        st.session_state.authenticated = True
+        st.session_state.user = current_user
+        st.session_state.subscription_tier = current_user.get('subscription_tier', 'free')
+    
+    # Shared data engine (created once per process)
+    data_engine = get_data_engine()
     
     # Render based on authentication
     if not st.session_state.authenticated:
-        render_login_page()
+        st.navigation([st.Page(render_login_page, title="Login", icon="🔐")], position="hidden").run()
         return
     
+    # Native multipage navigation - Streamlit renders the sidebar menu and
+    # runs only the selected page. The st.Page objects belong to this run, so
+    # they stay local rather than in module state other sessions could see
+    pages = {}
+    for icon, title, key in _NAV_PAGES:
+        pages[key] = _build_page(icon, title, key, data_engine, pages)
+    page = st.navigation(list(pages.values()))
+    
     # Main app for authenticated users
     render_header()
     
-    # Sidebar navigation
+    # Sidebar
     with st.sidebar:
-        st.markdown("### 🚀 Navigation")
-        
-        pages = {
-            "📊 Dashboard": "dashboard",
-            "🏆 Absolute Best Scanner": "scanner",
-            "🤖 AI Predictor": "ai_predictor",
-            "💼 Portfolio": "portfolio",
-            "🐋 Whale Detection": "whale",
-            "📈 Technical Analysis": "technical",
-            "🧠 Market Narratives": "narratives",
-            "⭐ Watchlist": "watchlist",
-            "👤 Profile": "profile",
-            "💎 Subscription": "subscription",
-            "⚙️ Settings": "settings"
-        }
-        
-        for name, key in pages.items():
-            if st.button(name, key=f"nav_{key}", use_container_width=True):
-                st.session_state.page = key
-                st.rerun()
-        
-        st.markdown("---")
-        
         # Quick stats
         st.markdown("### ⚡ Quick Stats")
         
         if MODULES_AVAILABLE and auth and db:
-            user = auth.get_current_user()
+            user = _current_user()
             if user:
                 # Get portfolio value
-                portfolios = db.get_user_portfolios(user["user_id"])
+                portfolios = _user_portfolios(user["user_id"])
                 total_value = sum(p.get('total_value', 0) for p in portfolios)
                 
                 # Get recent trades
-                trades = db.get_user_trades(user["user_id"], limit=5)
+                trades = _user_trades(user["user_id"], limit=5)
                 
-                st.markdown(f"""
-                <div style="padding: 10px; border-radius: 8px; background: rgba(0, 255, 136, 0.1); margin: 10px 0;">
-                    <div style="color: #888; font-size: 12px;">Total Portfolio</div>
-                    <div style="color: white; font-size: 24px; font-weight: bold;">${total_value:,.0f}</div>
-                    <div style="color: #888; font-size: 12px;">{len(trades)} recent trades</div>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(
+                    f"{_STATS_CARD_PREFIX}${total_value:,.0f}{_STATS_CARD_MIDDLE}{len(trades)}{_STATS_CARD_SUFFIX}",
+                    unsafe_allow_html=True
+                )
         
         # Logout button
         if st.button("🚪 Logout", use_container_width=True):
@@ -920,72 +1379,7 @@ def main():
             st.rerun()
     
     # Render current page
-    if st.session_state.page == 'dashboard':
-        render_dashboard(data_engine)
-    elif st.session_state.page == 'scanner':
-        render_absolute_best_scanner(data_engine)
-    elif st.session_state.page == 'ai_predictor':
-        st.markdown("## 🤖 AI PRICE PREDICTOR")
-        st.info("Real-time AI predictions coming soon!")
-    elif st.session_state.page == 'portfolio':
-        st.markdown("## 💼 PORTFOLIO MANAGEMENT")
-        render_user_profile()
-    elif st.session_state.page == 'whale':
-        st.markdown("## 🐋 WHALE DETECTION")
-        st.info("Real-time whale detection coming soon!")
-    elif st.session_state.page == 'technical':
-        st.markdown("## 📈 TECHNICAL ANALYSIS")
-        st.info("Advanced technical analysis coming soon!")
-    elif st.session_state.page == 'narratives':
-        st.markdown("## 🧠 MARKET NARRATIVES")
-        st.info("AI-powered market narratives coming soon!")
-    elif st.session_state.page == 'watchlist':
-        st.markdown("## ⭐ WATCHLIST")
-        if MODULES_AVAILABLE and auth and db:
-            user = auth.get_current_user()
-            if user:
-                watchlist = db.get_watchlist(user["user_id"])
-                if watchlist:
-                    for ticker in watchlist:
-                        with st.expander(f"{ticker}"):
-                            quote = data_engine.get_real_time_quote(ticker)
-                            st.metric("Price", f"${quote['price']:.2f}")
-                else:
-                    st.info("Your watchlist is empty. Add stocks from the scanner!")
-        else:
-            st.info("Watchlist requires database connection")
-    elif st.session_state.page == 'profile':
-        st.markdown("## 👤 USER PROFILE")
-        render_user_profile()
-    elif st.session_state.page == 'subscription':
-        render_subscription_page()
-    elif st.session_state.page == 'settings':
-        st.markdown("## ⚙️ SETTINGS")
-        
-        st.markdown("### API Configuration")
-        
-        # S3 Credentials
-        st.markdown("#### 📁 S3 Credentials (Read-only)")
-        col1, col2 = st.columns(2)
-        with col1:
-            st.text_input("Access Key ID", CONFIG.S3_ACCESS_KEY, disabled=True)
-        with col2:
-            st.text_input("Secret Access Key", CONFIG.S3_SECRET_KEY, type="password", disabled=True)
-        
-        st.markdown("#### ⚡ Application Settings")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            theme = st.selectbox("Theme", ["Dark", "Light", "Auto"])
-            refresh_rate = st.select_slider("Data Refresh Rate", 
-                                          options=["15m", "30m", "1h", "2h", "4h"], 
-                                          value="30m")
-        with col2:
-            notifications = st.checkbox("Enable Notifications", value=True)
-            sound_alerts = st.checkbox("Sound Alerts", value=False)
-        
-        if st.button("💾 Save Settings", use_container_width=True):
-            st.success("Settings saved!")
+    page.run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -7,68 +7,111 @@ Run this once before starting the app
 import os
 import sys
 
+from setup_utils import batched_output
+
+# Setup files, relative to data/ and pre-encoded for raw fd writes
+_FILES = {
+    "README.md": b"# Data Directory\n\nThis directory contains all user data, backups, and logs.",
+    ".gitignore": b"# Ignore all files in data directory\n*\n!.gitignore\n!README.md",
+    "logs/README.md": b"# Logs Directory\n\nApplication logs are stored here.",
+    "backups/README.md": b"# Backups Directory\n\nDatabase backups are stored here."
+}
+
+# Opening files relative to one data/ fd skips re-resolving the path each time
+_DIR_FD_SUPPORTED = os.open in os.supports_dir_fd and hasattr(os, "O_DIRECTORY")
+
+def _existing_entries(directories):
+    """Return which of the directories already exist, from one scandir per parent"""
+    existing = set()
+    for parent in {os.path.dirname(d) or "." for d in directories}:
+        try:
+            with os.scandir(parent) as entries:
+                existing.update(
+                    os.path.normpath(os.path.join(parent, entry.name))
+                    for entry in entries if entry.is_dir()
+                )
+        except FileNotFoundError:
+            pass
+    return {d for d in directories if os.path.normpath(d) in existing}
+
 def create_data_structure():
     """Create the necessary data directory structure"""
-    
-    print("=" * 60)
-    print("📁 CREATING DATA DIRECTORY STRUCTURE")
-    print("=" * 60)
-    
-    # Create main directories
-    directories = [
-        "data",
-        "data/backups",
-        "data/logs",
-        "data/exports",
-        "data/cache"
-    ]
-    
-    for directory in directories:
+    with batched_output() as out:
+        out.append("=" * 60)
+        out.append("📁 CREATING DATA DIRECTORY STRUCTURE")
+        out.append("=" * 60)
+        
+        # Create main directories
+        directories = [
+            "data",
+            "data/backups",
+            "data/logs",
+            "data/exports",
+            "data/cache"
+        ]
+        
+        # Snapshot what already exists so we only mkdir what's missing
+        existing = _existing_entries(directories)
+        
+        for directory in directories:
+            if directory in existing:
+                out.append(f"✅ Directory exists: {directory}")
+                continue
+            try:
+                os.mkdir(directory)
+                out.append(f"✅ Created directory: {directory}")
+            except Exception as e:
+                out.append(f"❌ Failed to create {directory}: {e}")
+        
+        # Create required files
         try:
-            os.makedirs(directory, exist_ok=True)
-            print(f"✅ Created directory: {directory}")
-        except Exception as e:
-            print(f"❌ Failed to create {directory}: {e}")
-    
-    # Create required files
-    files = {
-        "data/README.md": "# Data Directory\n\nThis directory contains all user data, backups, and logs.",
-        "data/.gitignore": "# Ignore all files in data directory\n*\n!.gitignore\n!README.md",
-        "data/logs/README.md": "# Logs Directory\n\nApplication logs are stored here.",
-        "data/backups/README.md": "# Backups Directory\n\nDatabase backups are stored here."
-    }
-    
-    for file_path, content in files.items():
+            data_fd = os.open("data", os.O_RDONLY | os.O_DIRECTORY) if _DIR_FD_SUPPORTED else None
+        except OSError:
+            data_fd = None
+        
         try:
-            with open(file_path, 'w') as f:
-                f.write(content)
-            print(f"✅ Created file: {file_path}")
-        except Exception as e:
-            print(f"❌ Failed to create {file_path}: {e}")
-    
-    # Set permissions (Unix-like systems)
-    if sys.platform != "win32":
-        try:
-            # Make data directory readable/writable
-            os.chmod("data", 0o755)
-            print("✅ Set directory permissions")
-        except:
-            pass
-    
-    print("\n" + "=" * 60)
-    print("✅ DATA STRUCTURE CREATED SUCCESSFULLY")
-    print("=" * 60)
-    print("\n📋 Directory structure:")
-    print("data/")
-    print("├── backups/     # Database backups")
-    print("├── logs/        # Application logs")
-    print("├── exports/     # Data exports (CSV, Excel)")
-    print("├── cache/       # Cached market data")
-    print("├── .gitignore   # Ignore data files in git")
-    print("└── README.md    # Documentation")
-    
-    print("\n🚀 Your data directory is ready!")
-    print("The database will be automatically created when you run the app.")
+            for name, content in _FILES.items():
+                file_path = f"data/{name}"
+                try:
+                    # Raw fd write - these are tiny, no need for a buffered text wrapper
+                    if data_fd is not None:
+                        fd = os.open(name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644, dir_fd=data_fd)
+                    else:
+                        fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                    try:
+                        os.write(fd, content)
+                    finally:
+                        os.close(fd)
+                    out.append(f"✅ Created file: {file_path}")
+                except Exception as e:
+                    out.append(f"❌ Failed to create {file_path}: {e}")
+        finally:
+            if data_fd is not None:
+                os.close(data_fd)
+        
+        # Set permissions (Unix-like systems)
+        if sys.platform != "win32":
+            try:
+                # Make data directory readable/writable
+                os.chmod("data", 0o755)
+                out.append("✅ Set directory permissions")
+            except:
+                pass
+        
+        out.append("\n" + "=" * 60)
+        out.append("✅ DATA STRUCTURE CREATED SUCCESSFULLY")
+        out.append("=" * 60)
+        out.append("\n📋 Directory structure:")
+        out.append("data/")
+        out.append("├── backups/     # Database backups")
+        out.append("├── logs/        # Application logs")
+        out.append("├── exports/     # Data exports (CSV, Excel)")
+        out.append("├── cache/       # Cached market data")
+        out.append("├── .gitignore   # Ignore data files in git")
+        out.append("└── README.md    # Documentation")
+        
+        out.append("\n🚀 Your data directory is ready!")
+        out.append("The database will be automatically created when you run the app.")
 
 if __name__ == "__main__":
     create_data_structure()
\ No newline at end of file
@@ -5,34 +5,37 @@ COMPLETE DEPLOYMENT SCRIPT FOR OMNISCIENT ONE
 Run this script to set up everything for deployment
 """
 
+import importlib.util
 import os
 import subprocess
 import sys
 import shutil
 
+from setup_utils import batched_output
+
 def setup_complete_deployment():
     """Complete deployment setup with data directory"""
-    
-    print("=" * 60)
-    print("🚀 OMNISCIENT ONE - COMPLETE DEPLOYMENT SETUP")
-    print("=" * 60)
-    
-    # Check Python version
-    print(f"📦 Python version: {sys.version}")
-    
-    # Create necessary directories
-    print("\n📁 Creating directory structure...")
-    os.makedirs(".streamlit", exist_ok=True)
-    os.makedirs("src", exist_ok=True)
-    os.makedirs("data", exist_ok=True)
-    os.makedirs("data/backups", exist_ok=True)
-    
-    print("✅ Directory structure created")
-    
-    # Create requirements.txt if not exists
-    if not os.path.exists("requirements.txt"):
-        print("\n📦 Creating requirements.txt...")
-        requirements = """streamlit==1.28.0
+    with batched_output() as out:
+        out.append("=" * 60)
+        out.append("🚀 OMNISCIENT ONE - COMPLETE DEPLOYMENT SETUP")
+        out.append("=" * 60)
+        
+        # Check Python version
+        out.append(f"📦 Python version: {sys.version}")
+        
+        # Create necessary directories
+        out.append("\n📁 Creating directory structure...")
+        os.makedirs(".streamlit", exist_ok=True)
+        os.makedirs("src", exist_ok=True)
+        os.makedirs("data", exist_ok=True)
+        os.makedirs("data/backups", exist_ok=True)
+        
+        out.append("✅ Directory structure created")
+        
+        # Create requirements.txt if not exists
+        if not os.path.exists("requirements.txt"):
+            out.append("\n📦 Creating requirements.txt...")
+            requirements = """streamlit==1.37.1
 pandas==2.0.3
 numpy==1.24.3
 plotly==5.17.0
@@ -42,16 +45,15 @@ python-dotenv==1.0.0
 sqlalchemy==2.0.23
 psycopg2-binary==2.9.9
 bcrypt==4.1.2
-pyjwt==2.8.0
 stripe==7.6.0"""
+            
+            with open("requirements.txt", "w") as f:
+                f.write(requirements)
+            out.append("✅ Created requirements.txt")
         
-        with open("requirements.txt", "w") as f:
-            f.write(requirements)
-        print("✅ Created requirements.txt")
-    
-    # Create config.toml
-    print("\n⚙️ Creating Streamlit config...")
-    config_content = """[theme]
+        # Create config.toml
+        out.append("\n⚙️ Creating Streamlit config...")
+        config_content = """[theme]
 primaryColor = "#00FF88"
 backgroundColor = "#0A0A0A"
 secondaryBackgroundColor = "#1A1A1A"
@@ -74,14 +76,14 @@ magicEnabled = false
 [client]
 showErrorDetails = false
 """
-    
-    with open(".streamlit/config.toml", "w") as f:
-        f.write(config_content)
-    print("✅ Created .streamlit/config.toml")
-    
-    # Create secrets.toml template
-    print("\n🔐 Creating secrets template...")
-    secrets_content = """# ============================================================================
+        
+        with open(".streamlit/config.toml", "w") as f:
+            f.write(config_content)
+        out.append("✅ Created .streamlit/config.toml")
+        
+        # Create secrets.toml template
+        out.append("\n🔐 Creating secrets template...")
+        secrets_content = """# ============================================================================
 # OMNISCIENT ONE - PRODUCTION SECRETS
 # ============================================================================
 # IMPORTANT: DO NOT SHARE THIS FILE
@@ -104,53 +106,53 @@ STRIPE_PUBLIC_KEY = ""
 # Database (Optional - for PostgreSQL)
 DATABASE_URL = ""
 """
-    
-    with open(".streamlit/secrets.toml", "w") as f:
-        f.write(secrets_content)
-    print("✅ Created .streamlit/secrets.toml")
-    print("⚠️  IMPORTANT: Keep this file secret!")
-    
-    # Check if source modules already exist
-    print("\n📁 Checking source modules...")
-    
-    # Create __init__.py if not exists
-    if not os.path.exists("src/__init__.py"):
-        with open("src/__init__.py", "w") as f:
-            f.write('"""Omniscient One Source Modules"""\n')
-        print("✅ Created src/__init__.py")
-    
-    # Copy source modules if they don't exist
-    source_files = ["auth.py", "database.py", "subscription.py"]
-    for file in source_files:
-        src_path = f"src/{file}"
-        if not os.path.exists(src_path):
-            print(f"⚠️  {file} not found in src/ directory")
-            print(f"   Please create src/{file} with the provided code")
-    
-    print("\n" + "=" * 60)
-    print("✅ SETUP COMPLETE!")
-    print("=" * 60)
-    
-    print("\n📋 NEXT STEPS:")
-    print("1. 📁 Create the source modules (auth.py, database.py, subscription.py) in src/")
-    print("2. 🚀 Test locally: streamlit run app.py")
-    print("3. 💾 Commit to GitHub: git add . && git commit -m 'Deployment ready' && git push")
-    print("4. ☁️  Deploy on Streamlit Cloud:")
-    print("   - Go to https://share.streamlit.io")
-    print("   - Click 'New app'")
-    print("   - Select your repository: omniscient-one")
-    print("   - Branch: main")
-    print("   - Main file path: app.py")
-    print("   - Click 'Advanced settings'")
-    print("   - Add secrets from .streamlit/secrets.toml")
-    print("   - Click 'Deploy!'")
-    
-    print("\n🔧 TROUBLESHOOTING:")
-    print("- If modules fail to import: Make sure src/ directory exists")
-    print("- If S3 connection fails: Check your S3 credentials")
-    print("- If database errors: Check if data/ directory is writable")
-    
-    print("\n🚀 YOUR TRADING PLATFORM IS READY FOR DEPLOYMENT!")
+        
+        with open(".streamlit/secrets.toml", "w") as f:
+            f.write(secrets_content)
+        out.append("✅ Created .streamlit/secrets.toml")
+        out.append("⚠️  IMPORTANT: Keep this file secret!")
+        
+        # Check if source modules already exist
+        out.append("\n📁 Checking source modules...")
+        
+        # Create __init__.py if not exists
+        if not os.path.exists("src/__init__.py"):
+            with open("src/__init__.py", "w") as f:
+                f.write('"""Omniscient One Source Modules"""\n')
+            out.append("✅ Created src/__init__.py")
+        
+        # Copy source modules if they don't exist
+        source_files = ["auth.py", "database.py", "subscription.py"]
+        for file in source_files:
+            src_path = f"src/{file}"
+            if not os.path.exists(src_path):
+                out.append(f"⚠️  {file} not found in src/ directory")
+                out.append(f"   Please create src/{file} with the provided code")
+        
+        out.append("\n" + "=" * 60)
+        out.append("✅ SETUP COMPLETE!")
+        out.append("=" * 60)
+        
+        out.append("\n📋 NEXT STEPS:")
+        out.append("1. 📁 Create the source modules (auth.py, database.py, subscription.py) in src/")
+        out.append("2. 🚀 Test locally: streamlit run app.py")
+        out.append("3. 💾 Commit to GitHub: git add . && git commit -m 'Deployment ready' && git push")
+        out.append("4. ☁️  Deploy on Streamlit Cloud:")
+        out.append("   - Go to https://share.streamlit.io")
+        out.append("   - Click 'New app'")
+        out.append("   - Select your repository: omniscient-one")
+        out.append("   - Branch: main")
+        out.append("   - Main file path: app.py")
+        out.append("   - Click 'Advanced settings'")
+        out.append("   - Add secrets from .streamlit/secrets.toml")
+        out.append("   - Click 'Deploy!'")
+        
+        out.append("\n🔧 TROUBLESHOOTING:")
+        out.append("- If modules fail to import: Make sure src/ directory exists")
+        out.append("- If S3 connection fails: Check your S3 credentials")
+        out.append("- If database errors: Check if data/ directory is writable")
+        
+        out.append("\n🚀 YOUR TRADING PLATFORM IS READY FOR DEPLOYMENT!")
 
 def test_installation():
     """Test if all dependencies are installed"""
@@ -167,10 +169,10 @@ def test_installation():
     
     all_ok = True
     for module, name in dependencies:
-        try:
-            __import__(module)
+        # find_spec only locates the package - no need to actually import it
+        if importlib.util.find_spec(module) is not None:
             print(f"✅ {name} installed")
-        except ImportError:
+        else:
             print(f"❌ {name} NOT installed")
             all_ok = False
     
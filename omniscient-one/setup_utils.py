@@ -0,0 +1,18 @@
+# setup_utils.py
+"""
+Helpers shared by the setup scripts (data.py and deploy.py)
+"""
+
+import contextlib
+import sys
+
+@contextlib.contextmanager
+def batched_output():
+    """Gather printed lines and flush them with one write on exit"""
+    out = []
+    try:
+        yield out
+    finally:
+        if out:
+            sys.stdout.write("\n".join(out) + "\n")
+            sys.stdout.flush()
@@ -0,0 +1,34 @@
+"""
+Shared JSON helpers - orjson when it is installed, the stdlib otherwise
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def dumps_bytes(data: Any) -> bytes:
+    """Compact UTF-8 JSON bytes (tokens, BLOB columns)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=_ORJSON_OPTIONS)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def dumps_str(data: Any) -> str:
+    """Compact JSON string (TEXT columns)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=_ORJSON_OPTIONS).decode('utf-8')
+    return json.dumps(data, separators=(',', ':'))
+
+def loads(data: Any) -> Any:
+    """Parse JSON from str, bytes or memoryview"""
+    if isinstance(data, memoryview):
+        # psycopg2 hands BYTEA columns back as memoryview
+        data = bytes(data)
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
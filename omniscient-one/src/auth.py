@@ -3,33 +3,101 @@ Authentication and User Management System
 Handles user registration, login, JWT tokens, and security
 """
 
-import streamlit as st
-import jwt
-import bcrypt
 import uuid
 from datetime import datetime, timedelta
+import base64
+import functools
 import hashlib
+import hmac
+import re
 import secrets
+import time
 from typing import Dict, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import os
 
+from ._json import dumps_bytes as _json_dumps, loads as _json_loads
+
+# Streamlit is heavy to import, so load it only once a session is touched
+_st = None
+
+def _get_st():
+    """Import streamlit on first use"""
+    global _st
+    if _st is None:
+        import streamlit as _st_mod
+        _st = _st_mod
+    return _st
+
+def _b64url_encode(data: bytes) -> bytes:
+    """Unpadded base64url, as JWT requires"""
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+def _b64url_decode(data: bytes) -> bytes:
+    """Decode unpadded base64url"""
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+# The header never changes, so encode it once
+_JWT_HEADER = _b64url_encode(_json_dumps({"alg": "HS256", "typ": "JWT"}))
+
+# Input validation patterns
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_USERNAME_RE = re.compile(r'^[a-zA-Z0-9_]{3,20}$')
+
+# Shared bcrypt worker pool - bcrypt releases the GIL, so threads hash in
+# parallel across cores without the pickling cost of a process pool
+_BCRYPT_POOL = None
+_BCRYPT_POOL_LOCK = threading.Lock()
+
+def _get_bcrypt_pool() -> ThreadPoolExecutor:
+    """Get or create the bcrypt worker pool"""
+    global _BCRYPT_POOL
+    if _BCRYPT_POOL is None:
+        with _BCRYPT_POOL_LOCK:
+            if _BCRYPT_POOL is None:
+                _BCRYPT_POOL = ThreadPoolExecutor(
+                    max_workers=os.cpu_count() or 1,
+                    thread_name_prefix="bcrypt"
+                )
+    return _BCRYPT_POOL
+
 class AuthManager:
     """Complete authentication and user management system"""
     
-    def __init__(self):
+    def __init__(self, bcrypt_rounds: Optional[int] = None):
+        st = _get_st()
+        
         # Load secret from environment or Streamlit secrets
         self.jwt_secret = st.secrets.get("JWT_SECRET", os.getenv("JWT_SECRET", "production-secret-key-change-me"))
         self.token_expiry_days = 30
+        self._token_lifetime = int(timedelta(days=self.token_expiry_days).total_seconds())
         
-        # Initialize database connection
-        from .database import DatabaseManager
-        self.db = DatabaseManager()
+        # bcrypt work factor - lower it via BCRYPT_ROUNDS for dev/test, bcrypt accepts 4-31
+        if bcrypt_rounds is None:
+            try:
+                bcrypt_rounds = int(os.getenv("BCRYPT_ROUNDS", "12"))
+            except ValueError:
+                # A malformed value must not take auth down - fall back to the default
+                bcrypt_rounds = 12
+        self.bcrypt_rounds = max(4, min(31, bcrypt_rounds))
+        
+        # HS256 signer keyed once - each token copies it instead of re-keying
+        self._jwt_hmac = hmac.new(self.jwt_secret.encode('utf-8'), digestmod=hashlib.sha256)
+        
+        # Tokens are immutable, so each one only needs its signature checked once
+        self._decode_token_cached = functools.lru_cache(maxsize=4096)(self._decode_token)
+        
+        # Share the process-wide database manager (one write lock, writer thread and pool)
+        from .database import get_database_manager
+        self.db = get_database_manager()
         
         # Initialize session state
         self._init_session()
     
     def _init_session(self):
         """Initialize session state variables"""
+        st = _get_st()
         if 'user' not in st.session_state:
             st.session_state.user = None
         if 'authenticated' not in st.session_state:
@@ -39,17 +107,20 @@ class AuthManager:
     
     def hash_password(self, password: str) -> str:
         """Securely hash a password"""
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+        import bcrypt
+        salt = bcrypt.gensalt(rounds=self.bcrypt_rounds)
+        hashed = _get_bcrypt_pool().submit(bcrypt.hashpw, password.encode('utf-8'), salt).result()
         return hashed.decode('utf-8')
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
+        import bcrypt
         try:
-            return bcrypt.checkpw(
+            return _get_bcrypt_pool().submit(
+                bcrypt.checkpw,
                 plain_password.encode('utf-8'),
                 hashed_password.encode('utf-8')
-            )
+            ).result()
         except Exception:
             return False
     
@@ -70,15 +141,19 @@ class AuthManager:
         if self.db.user_exists(email, username):
             return {"success": False, "error": "User already exists"}
         
+        # One timestamp for every field this signup writes
+        now = datetime.now()
+        now_iso = now.isoformat(timespec='seconds')
+        
         # Create user in database
         user_data = {
-            "user_id": str(uuid.uuid4()),
+            "user_id": uuid.uuid4().hex,
             "email": email.lower(),
             "username": username,
             "password_hash": self.hash_password(password),
             "subscription_tier": "free",
-            "subscription_expiry": (datetime.now() + timedelta(days=14)).isoformat(),  # 14-day trial
-            "created_at": datetime.now().isoformat(),
+            "subscription_expiry": (now + timedelta(days=14)).isoformat(timespec='seconds'),  # 14-day trial
+            "created_at": now_iso,
             "last_login": None,
             "api_key": self._generate_api_key(username),
             "settings": {
@@ -96,11 +171,11 @@ class AuthManager:
             # Create default portfolio
             portfolio_data = {
                 "user_id": user_data["user_id"],
-                "portfolio_id": str(uuid.uuid4()),
+                "portfolio_id": uuid.uuid4().hex,
                 "name": "My Portfolio",
                 "holdings": {},
                 "total_value": 10000.0,
-                "created_at": datetime.now().isoformat()
+                "created_at": now_iso
             }
             self.db.create_portfolio(portfolio_data)
             
@@ -140,6 +215,7 @@ class AuthManager:
         token = self.create_token(user)
         
         # Update session state
+        st = _get_st()
         st.session_state.user = {
             "user_id": user["user_id"],
             "username": user["username"],
@@ -158,36 +234,62 @@ class AuthManager:
     
     def create_token(self, user_data: Dict) -> str:
         """Create JWT token for authenticated user"""
+        now = int(time.time())
         payload = {
             "sub": user_data["user_id"],
             "username": user_data["username"],
             "email": user_data["email"],
             "tier": user_data["subscription_tier"],
-            "exp": datetime.utcnow() + timedelta(days=self.token_expiry_days),
-            "iat": datetime.utcnow(),
-            "jti": str(uuid.uuid4())
+            "exp": now + self._token_lifetime,
+            "iat": now,
+            "jti": secrets.token_hex(8)
         }
         
-        return jwt.encode(payload, self.jwt_secret, algorithm="HS256")
+        signing_input = _JWT_HEADER + b'.' + _b64url_encode(_json_dumps(payload))
+        return (signing_input + b'.' + _b64url_encode(self._sign(signing_input))).decode('ascii')
     
     def verify_token(self, token: str) -> Optional[Dict]:
         """Verify JWT token and return payload if valid"""
+        payload = self._decode_token_cached(token)
+        if payload is None or payload.get("exp", 0) < time.time():
+            return None
+        # Copy so callers can't mutate the cached payload
+        return dict(payload)
+    
+    def _decode_token(self, token: str) -> Optional[Dict]:
+        """Check a token's signature and return its payload (expiry is checked by the caller)"""
         try:
-            payload = jwt.decode(token, self.jwt_secret, algorithms=["HS256"])
+            signing_input, _, signature = token.encode('ascii').rpartition(b'.')
+            header, _, body = signing_input.partition(b'.')
+            if header != _JWT_HEADER and _json_loads(_b64url_decode(header)).get("alg") != "HS256":
+                return None
+            
+            if not hmac.compare_digest(_b64url_decode(signature), self._sign(signing_input)):
+                return None
+            
+            payload = _json_loads(_b64url_decode(body))
+            if not isinstance(payload, dict) or not isinstance(payload.get("exp", 0), (int, float)):
+                return None
             return payload
-        except jwt.ExpiredSignatureError:
-            return None
-        except jwt.InvalidTokenError:
+        except (ValueError, TypeError, AttributeError):
             return None
     
+    def _sign(self, signing_input: bytes) -> bytes:
+        """HS256 signature of a JWT signing input"""
+        mac = self._jwt_hmac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+    
     def logout(self):
         """Log out current user"""
+        st = _get_st()
         st.session_state.user = None
         st.session_state.authenticated = False
         st.session_state.token = None
     
     def get_current_user(self) -> Optional[Dict]:
         """Get current authenticated user"""
+        st = _get_st()
         if st.session_state.authenticated and st.session_state.user:
             return st.session_state.user
         return None
@@ -196,6 +298,7 @@ class AuthManager:
         """Decorator to require authentication for functions"""
         def decorator(func):
             def wrapper(*args, **kwargs):
+                st = _get_st()
                 if not st.session_state.authenticated:
                     st.error("Authentication required")
                     st.info("Please login to access this feature")
@@ -206,15 +309,11 @@ class AuthManager:
     
     def _validate_email(self, email: str) -> bool:
         """Validate email format"""
-        import re
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        return _EMAIL_RE.match(email) is not None
     
     def _validate_username(self, username: str) -> bool:
         """Validate username format"""
-        import re
-        pattern = r'^[a-zA-Z0-9_]{3,20}$'
-        return bool(re.match(pattern, username))
+        return _USERNAME_RE.match(username) is not None
     
     def _validate_password(self, password: str) -> bool:
         """Validate password strength"""
@@ -225,10 +324,8 @@ class AuthManager:
     
     def _generate_api_key(self, username: str) -> str:
         """Generate unique API key for user"""
-        timestamp = str(int(datetime.now().timestamp()))
-        random_str = secrets.token_urlsafe(16)
-        base_str = f"{username}_{timestamp}_{random_str}"
-        return hashlib.sha256(base_str.encode()).hexdigest()[:32]
+        # 128 random bits as 32 hex chars - same shape as the old hashed keys
+        return secrets.token_hex(16)
     
     def _send_welcome_email(self, email: str, username: str):
         """Send welcome email to new user (async)"""
@@ -265,12 +362,16 @@ class AuthManager:
                 return True
         return False
 
-# Create singleton instance
+# Singleton instance, created on first call
 auth_manager = None
+_auth_manager_lock = threading.Lock()
 
 def get_auth_manager():
     """Get or create singleton AuthManager instance"""
     global auth_manager
+    # Double-checked so concurrent first calls from Streamlit threads build only one instance
     if auth_manager is None:
-        auth_manager = AuthManager()
+        with _auth_manager_lock:
+            if auth_manager is None:
+                auth_manager = AuthManager()
     return auth_manager
\ No newline at end of file
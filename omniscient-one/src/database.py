@@ -3,15 +3,125 @@ Database Management System
 Handles all data persistence for users, portfolios, trades, and settings
 """
 
-import json
+import atexit
+import hashlib
+import queue
 import sqlite3
 import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing, contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
 import streamlit as st
 import os
 import pandas as pd
 
+from ._json import dumps_bytes as _json_dumps_bytes, dumps_str as _json_dumps, loads as _json_loads
+
+# Applied to every new SQLite connection - WAL lets readers run alongside
+# the writer, and synchronous=NORMAL drops an fsync per commit (safe in WAL)
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+# The market data cache lives in its own file - it is rebuildable, so it skips
+# fsyncs entirely and its writes never queue behind user transactions
+_SQLITE_CACHE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Bumped whenever market_data_cache changes shape - the cache is simply rebuilt.
+# Version 1 stores timestamp/expiry as INTEGER unix milliseconds, version 2
+# stores data as a JSON BLOB.
+_CACHE_SCHEMA_VERSION = 2
+
+# Seconds between sweeps of expired market_data_cache rows
+_CACHE_GC_INTERVAL = 300
+
+# Insert statements shared by the single-row and bulk methods
+_INSERT_USER_SQL = '''
+INSERT INTO users (
+    user_id, email, username, password_hash,
+    subscription_tier, subscription_expiry, created_at,
+    api_key, settings
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_INSERT_TRADE_SQL = '''
+INSERT INTO trades (
+    trade_id, user_id, portfolio_id, ticker,
+    action, quantity, price, total, timestamp, status, notes
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_INSERT_ALERT_SQL = '''
+INSERT INTO alerts (
+    alert_id, user_id, ticker, alert_type,
+    condition, threshold, created_at
+) VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+_UPSERT_CACHE_SQL = '''
+INSERT OR REPLACE INTO market_data_cache
+(cache_id, ticker, data_type, data, timestamp, expiry)
+VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# PostgreSQL bulk variants - execute_values expands VALUES %s into one multi-row statement
+_PG_INSERT_USER_SQL = '''
+INSERT INTO users (
+    user_id, email, username, password_hash,
+    subscription_tier, subscription_expiry, created_at,
+    api_key, settings
+) VALUES %s
+'''
+
+_PG_INSERT_TRADE_SQL = '''
+INSERT INTO trades (
+    trade_id, user_id, portfolio_id, ticker,
+    action, quantity, price, total, timestamp, status, notes
+) VALUES %s
+'''
+
+_PG_INSERT_ALERT_SQL = '''
+INSERT INTO alerts (
+    alert_id, user_id, ticker, alert_type,
+    condition, threshold, created_at
+) VALUES %s
+'''
+
+_PG_UPSERT_CACHE_SQL = '''
+INSERT INTO market_data_cache
+(cache_id, ticker, data_type, data, timestamp, expiry)
+VALUES %s
+ON CONFLICT (cache_id) DO UPDATE
+SET data = EXCLUDED.data, timestamp = EXCLUDED.timestamp, expiry = EXCLUDED.expiry
+'''
+
+# Seconds a last_login bump may wait in memory before being written
+_LAST_LOGIN_FLUSH_DELAY = 5.0
+
+# Portfolio columns callers may set through update_portfolio
+_ALLOWED_PORTFOLIO_COLS = frozenset({"name", "holdings", "total_value"})
+
+# Most queued writes the writer thread folds into one commit
+_WRITE_BATCH_MAX = 500
+
+# Rows pulled per fetchmany call when streaming results
+_FETCH_ARRAYSIZE = 200
+
+# Rows per executemany/execute_values page in the bulk methods - the whole call is still one transaction
+_BULK_BATCH_SIZE = 500
+
 class DatabaseManager:
     """Complete database management system with SQLite/PostgreSQL support"""
     
@@ -24,19 +134,50 @@ class DatabaseManager:
         """
         self.db_type = db_type
         self.db_path = "data/omniscient.db"
+        self.cache_db_path = "data/omniscient_cache.db"
+        # Serializes writers only - readers run concurrently under WAL
         self.lock = threading.Lock()
+        self.cache_lock = threading.Lock()
+        
+        # Idle connections kept open for reuse instead of reconnecting per query
+        self._pool = queue.LifoQueue(maxsize=8)
+        self._cache_pool = queue.LifoQueue(maxsize=8)
+        
+        # UPDATE statements per set of portfolio columns, so the same shape reuses one SQL string
+        self._update_sql_cache = {}
+        
+        # last_login bumps are buffered and written together, flushed on exit too
+        self._last_login_buf = {}
+        self._last_login_lock = threading.Lock()
+        self._last_login_timer = None
+        atexit.register(self._flush_last_login)
+        
+        # Single writer thread that group-commits small queued writes
+        self._write_q = queue.Queue()
+        threading.Thread(target=self._writer_loop, name="db-writer", daemon=True).start()
+        atexit.register(self._write_q.join)
         
         # Create data directory if it doesn't exist
         os.makedirs("data", exist_ok=True)
         
         # Initialize database
         self._init_database()
+        self._init_cache_database()
+        self._start_cache_gc()
     
-    def _get_connection(self):
-        """Get database connection"""
+    def _get_connection(self, cache: bool = False):
+        """Get database connection (cache=True opens the SQLite market data cache file)"""
         if self.db_type == "sqlite":
-            conn = sqlite3.connect(self.db_path)
+            # Pooled connections move between threads, but only one uses each at a time.
+            # The statement cache is sized to hold every query this class issues.
+            conn = sqlite3.connect(
+                self.cache_db_path if cache else self.db_path,
+                check_same_thread=False,
+                cached_statements=256
+            )
             conn.row_factory = sqlite3.Row
+            for pragma in (_SQLITE_CACHE_PRAGMAS if cache else _SQLITE_PRAGMAS):
+                conn.execute(pragma)
             return conn
         elif self.db_type == "postgresql":
             # PostgreSQL connection (for production)
@@ -52,10 +193,31 @@ class DatabaseManager:
         else:
             raise ValueError(f"Unsupported database type: {self.db_type}")
     
+    @contextmanager
+    def _conn(self, cache: bool = False):
+        """Borrow a pooled connection, rolling back anything left open on error"""
+        # Only SQLite splits the cache out - PostgreSQL keeps it in the main database
+        cache = cache and self.db_type == "sqlite"
+        pool = self._cache_pool if cache else self._pool
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = self._get_connection(cache)
+        
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            try:
+                pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+    
     def _init_database(self):
         """Initialize database tables"""
-        with self.lock:
-            conn = self._get_connection()
+        with self.lock, self._conn() as conn:
             cursor = conn.cursor()
             
             # Users table
@@ -122,6 +284,32 @@ class DatabaseManager:
             )
             ''')
             
+            # One row per ticker held - the portfolios.holdings JSON column is only read for legacy rows.
+            # Column affinity applies: quantity NUMERIC reads an integral float (10.0) back as int 10,
+            # and cost_basis REAL reads an int back as float
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS portfolio_holdings (
+                portfolio_id TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                quantity NUMERIC,
+                cost_basis REAL,
+                extra TEXT,
+                PRIMARY KEY (portfolio_id, ticker),
+                FOREIGN KEY (portfolio_id) REFERENCES portfolios (portfolio_id)
+            )
+            ''')
+            
+            # One row per watched ticker, position keeps the user's ordering
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS watchlist_tickers (
+                watchlist_id TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (watchlist_id, ticker),
+                FOREIGN KEY (watchlist_id) REFERENCES watchlists (watchlist_id)
+            )
+            ''')
+            
             # Alerts table
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS alerts (
@@ -138,18 +326,6 @@ class DatabaseManager:
             )
             ''')
             
-            # Market data cache
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS market_data_cache (
-                cache_id TEXT PRIMARY KEY,
-                ticker TEXT NOT NULL,
-                data_type TEXT NOT NULL,
-                data TEXT NOT NULL,
-                timestamp TEXT NOT NULL,
-                expiry TEXT NOT NULL
-            )
-            ''')
-            
             # API usage tracking
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS api_usage (
@@ -162,23 +338,90 @@ class DatabaseManager:
             )
             ''')
             
+            # Indexes for the per-user lookups and cache expiry scans
+            # Covers get_recent_trades outright, and still serves the SELECT * history queries
+            cursor.execute('DROP INDEX IF EXISTS idx_trades_user_ts')
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_trades_user_ts_cov
+            ON trades(user_id, timestamp DESC, ticker, action, quantity, price, trade_id)
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_user ON alerts(user_id, created_at DESC)')
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_api_usage_key ON api_usage(user_id, endpoint, date)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_portfolios_user ON portfolios(user_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_watchlists_user_name ON watchlists(user_id, name)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_holdings_ticker ON portfolio_holdings(ticker)')
+            # Only users with an outstanding reset carry a token, so the partial index stays tiny
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_reset_token ON users(reset_token) WHERE reset_token IS NOT NULL'
+            )
+            
+            conn.commit()
+    
+    def _init_cache_database(self):
+        """Initialize the market data cache table"""
+        with self.cache_lock, self._conn(cache=True) as conn:
+            cursor = conn.cursor()
+            
+            if self.db_type == "sqlite":
+                cursor.execute('PRAGMA user_version')
+                if cursor.fetchone()[0] < _CACHE_SCHEMA_VERSION:
+                    cursor.execute('DROP TABLE IF EXISTS market_data_cache')
+                    cursor.execute(f'PRAGMA user_version = {_CACHE_SCHEMA_VERSION}')
+            
+            # PostgreSQL has no BLOB type - its binary column is BYTEA. Its INTEGER is
+            # 32-bit, too small for epoch milliseconds, so those need BIGINT there
+            if self.db_type == "postgresql":
+                blob_type, ms_type = "BYTEA", "BIGINT"
+            else:
+                blob_type, ms_type = "BLOB", "INTEGER"
+            cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS market_data_cache (
+                cache_id TEXT PRIMARY KEY,
+                ticker TEXT NOT NULL,
+                data_type TEXT NOT NULL,
+                data {blob_type} NOT NULL,
+                timestamp {ms_type} NOT NULL,
+                expiry {ms_type} NOT NULL
+            )
+            ''')
+            
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cache_expiry ON market_data_cache(expiry)')
+            
             conn.commit()
-            conn.close()
+    
+    def _start_cache_gc(self):
+        """Start the daemon thread that deletes expired cache rows"""
+        thread = threading.Thread(target=self._cache_gc_loop, name="market-cache-gc", daemon=True)
+        thread.start()
+    
+    def _cache_gc_loop(self):
+        """Periodically purge cache rows whose expiry has passed"""
+        while True:
+            time.sleep(_CACHE_GC_INTERVAL)
+            self.purge_expired_cache()
+    
+    def purge_expired_cache(self) -> int:
+        """Delete expired market data cache rows, returning how many were removed"""
+        try:
+            with self.cache_lock, self._conn(cache=True) as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                DELETE FROM market_data_cache WHERE expiry < ?
+                ''', (time.time_ns() // 1_000_000,))
+                
+                conn.commit()
+                return cursor.rowcount
+        except Exception:
+            return 0
     
     def create_user(self, user_data: Dict) -> bool:
         """Create a new user in database"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self.lock, self._conn() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                INSERT INTO users (
-                    user_id, email, username, password_hash,
-                    subscription_tier, subscription_expiry, created_at,
-                    api_key, settings
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+                cursor.execute(_INSERT_USER_SQL, (
                     user_data["user_id"],
                     user_data["email"],
                     user_data["username"],
@@ -187,21 +430,37 @@ class DatabaseManager:
                     user_data["subscription_expiry"],
                     user_data["created_at"],
                     user_data["api_key"],
-                    json.dumps(user_data.get("settings", {}))
+                    _json_dumps(user_data.get("settings", {}))
                 ))
                 
                 conn.commit()
-                conn.close()
                 return True
         except Exception as e:
             print(f"Error creating user: {e}")
             return False
     
+    def create_users_bulk(self, users: List[Dict]) -> int:
+        """Create many users in one transaction, returning how many were inserted"""
+        rows = [
+            (
+                user_data["user_id"],
+                user_data["email"],
+                user_data["username"],
+                user_data["password_hash"],
+                user_data["subscription_tier"],
+                user_data["subscription_expiry"],
+                user_data["created_at"],
+                user_data["api_key"],
+                _json_dumps(user_data.get("settings", {}))
+            )
+            for user_data in users
+        ]
+        return self._insert_bulk(_INSERT_USER_SQL, _PG_INSERT_USER_SQL, rows, "users")
+    
     def get_user_by_identifier(self, identifier: str) -> Optional[Dict]:
         """Get user by email or username"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -210,7 +469,6 @@ class DatabaseManager:
                 ''', (identifier.lower(), identifier))
                 
                 row = cursor.fetchone()
-                conn.close()
                 
                 if row:
                     return self._row_to_dict(row)
@@ -222,8 +480,7 @@ class DatabaseManager:
     def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Get user by email"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -231,7 +488,6 @@ class DatabaseManager:
                 ''', (email.lower(),))
                 
                 row = cursor.fetchone()
-                conn.close()
                 
                 if row:
                     return self._row_to_dict(row)
@@ -242,8 +498,7 @@ class DatabaseManager:
     def get_user_by_id(self, user_id: str) -> Optional[Dict]:
         """Get user by user_id"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -251,7 +506,6 @@ class DatabaseManager:
                 ''', (user_id,))
                 
                 row = cursor.fetchone()
-                conn.close()
                 
                 if row:
                     return self._row_to_dict(row)
@@ -262,8 +516,7 @@ class DatabaseManager:
     def user_exists(self, email: str, username: str) -> bool:
         """Check if user with given email or username exists"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -272,33 +525,55 @@ class DatabaseManager:
                 ''', (email.lower(), username))
                 
                 result = cursor.fetchone()
-                conn.close()
                 
                 return result["count"] > 0
         except Exception:
             return False
     
     def update_last_login(self, user_id: str):
-        """Update user's last login timestamp"""
+        """Update user's last login timestamp (written within a few seconds)"""
+        with self._last_login_lock:
+            self._last_login_buf[user_id] = datetime.now().isoformat()
+            self._arm_last_login_timer()
+    
+    def _arm_last_login_timer(self):
+        """Schedule a flush unless one is pending (caller holds _last_login_lock)"""
+        if self._last_login_timer is None:
+            timer = threading.Timer(_LAST_LOGIN_FLUSH_DELAY, self._flush_last_login)
+            timer.daemon = True
+            timer.start()
+            self._last_login_timer = timer
+    
+    def _flush_last_login(self):
+        """Write all buffered last_login timestamps in one transaction"""
+        with self._last_login_lock:
+            pending, self._last_login_buf = self._last_login_buf, {}
+            self._last_login_timer = None
+        
+        if not pending:
+            return
+        
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self.lock, self._conn() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
+                cursor.executemany('''
                 UPDATE users SET last_login = ? WHERE user_id = ?
-                ''', (datetime.now().isoformat(), user_id))
+                ''', [(last_login, user_id) for user_id, last_login in pending.items()])
                 
                 conn.commit()
-                conn.close()
-        except Exception:
-            pass
+        except Exception as e:
+            print(f"Error flushing {len(pending)} last_login updates, will retry: {e}")
+            with self._last_login_lock:
+                # Logins buffered since the swap are newer, so they win over the failed ones
+                for user_id, last_login in pending.items():
+                    self._last_login_buf.setdefault(user_id, last_login)
+                self._arm_last_login_timer()
     
     def update_subscription(self, user_id: str, tier: str, expiry: str) -> bool:
         """Update user's subscription"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self.lock, self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -308,35 +583,54 @@ class DatabaseManager:
                 ''', (tier, expiry, user_id))
                 
                 conn.commit()
-                conn.close()
                 return True
         except Exception:
             return False
     
+    def update_subscriptions_bulk(self, rows: List[tuple]) -> int:
+        """Apply many (user_id, tier, expiry) subscription changes in one transaction"""
+        if not rows:
+            return 0
+        
+        try:
+            with self.lock, self._conn() as conn:
+                cursor = conn.cursor()
+                
+                cursor.executemany('''
+                UPDATE users 
+                SET subscription_tier = ?, subscription_expiry = ?
+                WHERE user_id = ?
+                ''', [(tier, expiry, user_id) for user_id, tier, expiry in rows])
+                
+                conn.commit()
+                return len(rows)
+        except Exception as e:
+            print(f"Error bulk updating subscriptions: {e}")
+            return 0
+    
     def create_portfolio(self, portfolio_data: Dict) -> bool:
         """Create a new portfolio"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self.lock, self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
                 INSERT INTO portfolios (
                     portfolio_id, user_id, name, holdings,
                     total_value, created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ) VALUES (?, ?, ?, NULL, ?, ?, ?)
                 ''', (
                     portfolio_data["portfolio_id"],
                     portfolio_data["user_id"],
                     portfolio_data["name"],
-                    json.dumps(portfolio_data.get("holdings", {})),
                     portfolio_data.get("total_value", 0.0),
                     portfolio_data["created_at"],
                     datetime.now().isoformat()
                 ))
                 
+                self._sync_holdings(cursor, portfolio_data["portfolio_id"], portfolio_data.get("holdings", {}))
+                
                 conn.commit()
-                conn.close()
                 return True
         except Exception:
             return False
@@ -344,95 +638,155 @@ class DatabaseManager:
     def get_user_portfolios(self, user_id: str) -> List[Dict]:
         """Get all portfolios for a user"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
                 SELECT * FROM portfolios WHERE user_id = ?
                 ''', (user_id,))
                 
-                rows = cursor.fetchall()
-                conn.close()
+                portfolios = self._rows_to_dicts(cursor, cursor.fetchall())
+                
+                cursor.execute('''
+                SELECT h.portfolio_id, h.ticker, h.quantity, h.cost_basis, h.extra
+                FROM portfolio_holdings h
+                JOIN portfolios p ON p.portfolio_id = h.portfolio_id
+                WHERE p.user_id = ?
+                ''', (user_id,))
+                
+                holdings = {}
+                for row in cursor.fetchall():
+                    holdings.setdefault(row["portfolio_id"], {})[row["ticker"]] = self._holding_value(row)
+                
+                for portfolio in portfolios:
+                    legacy = portfolio["holdings"]
+                    if portfolio["portfolio_id"] in holdings or not legacy:
+                        portfolio["holdings"] = holdings.get(portfolio["portfolio_id"], {})
+                    else:
+                        portfolio["holdings"] = _json_loads(legacy)
                 
-                return [self._row_to_dict(row) for row in rows]
+                return portfolios
         except Exception:
             return []
     
     def update_portfolio(self, portfolio_id: str, updates: Dict) -> bool:
         """Update portfolio data"""
+        # Column names end up in the SQL text, so only known columns are accepted
+        if not updates.keys() <= _ALLOWED_PORTFOLIO_COLS:
+            return False
+        
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self.lock, self._conn() as conn:
                 cursor = conn.cursor()
                 
-                # Build update query dynamically
-                set_clause = []
-                values = []
+                columns = tuple(sorted(key for key in updates if key != "holdings"))
+                if "holdings" in updates:
+                    # Only the changed tickers are written, and the legacy JSON copy is dropped
+                    self._sync_holdings(cursor, portfolio_id, updates["holdings"])
                 
-                for key, value in updates.items():
-                    if key in ["holdings"]:
-                        value = json.dumps(value)
-                    set_clause.append(f"{key} = ?")
-                    values.append(value)
-                
-                # Add updated_at timestamp
-                set_clause.append("updated_at = ?")
+                query = self._portfolio_update_sql(columns, "holdings" in updates)
+                values = [updates[key] for key in columns]
                 values.append(datetime.now().isoformat())
-                
                 values.append(portfolio_id)
                 
-                query = f'''
-                UPDATE portfolios 
-                SET {', '.join(set_clause)}
-                WHERE portfolio_id = ?
-                '''
-                
                 cursor.execute(query, tuple(values))
                 conn.commit()
-                conn.close()
                 return True
         except Exception:
             return False
     
+    def _portfolio_update_sql(self, columns: tuple, clear_holdings: bool) -> str:
+        """Build (once) the UPDATE statement for a given set of portfolio columns"""
+        key = (columns, clear_holdings)
+        query = self._update_sql_cache.get(key)
+        if query is None:
+            set_clause = [f"{column} = ?" for column in columns]
+            if clear_holdings:
+                set_clause.append("holdings = NULL")
+            set_clause.append("updated_at = ?")
+            
+            query = f'''
+            UPDATE portfolios 
+            SET {', '.join(set_clause)}
+            WHERE portfolio_id = ?
+            '''
+            self._update_sql_cache[key] = query
+        return query
+    
     def create_trade(self, trade_data: Dict) -> bool:
         """Record a new trade"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            now = datetime.now()
+            
+            # Committed by the writer thread, possibly together with other queued writes.
+            # No timeout: the writer resolves every future, and giving up early would
+            # report False for a trade that may still be committed (and then retried)
+            return self._submit_write(_INSERT_TRADE_SQL, (
+                trade_data.get("trade_id", f"trade_{now.timestamp()}"),
+                trade_data["user_id"],
+                trade_data.get("portfolio_id"),
+                trade_data["ticker"],
+                trade_data["action"],
+                trade_data["quantity"],
+                trade_data["price"],
+                trade_data["total"],
+                trade_data.get("timestamp", now.isoformat()),
+                trade_data.get("status", "completed"),
+                trade_data.get("notes", "")
+            )).result()
+        except Exception:
+            return False
+    
+    def create_trades_bulk(self, trades: List[Dict]) -> int:
+        """Record many trades in one transaction, returning how many were inserted"""
+        now = datetime.now()
+        now_iso = now.isoformat()
+        rows = [
+            (
+                trade_data.get("trade_id", f"trade_{now.timestamp()}_{i}"),
+                trade_data["user_id"],
+                trade_data.get("portfolio_id"),
+                trade_data["ticker"],
+                trade_data["action"],
+                trade_data["quantity"],
+                trade_data["price"],
+                trade_data["total"],
+                trade_data.get("timestamp", now_iso),
+                trade_data.get("status", "completed"),
+                trade_data.get("notes", "")
+            )
+            for i, trade_data in enumerate(trades)
+        ]
+        return self._insert_bulk(_INSERT_TRADE_SQL, _PG_INSERT_TRADE_SQL, rows, "trades")
+    
+    def get_user_trades(self, user_id: str, limit: int = 50) -> List[Dict]:
+        """Get recent trades for a user"""
+        return list(self.iter_user_trades(user_id, limit))
+    
+    def get_recent_trades(self, user_id: str, limit: int = 5) -> List[Dict]:
+        """Get a user's latest trades with just the summary columns, read from the index alone"""
+        try:
+            with self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
-                INSERT INTO trades (
-                    trade_id, user_id, portfolio_id, ticker,
-                    action, quantity, price, total, timestamp, status, notes
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    trade_data.get("trade_id", f"trade_{datetime.now().timestamp()}"),
-                    trade_data["user_id"],
-                    trade_data.get("portfolio_id"),
-                    trade_data["ticker"],
-                    trade_data["action"],
-                    trade_data["quantity"],
-                    trade_data["price"],
-                    trade_data["total"],
-                    trade_data.get("timestamp", datetime.now().isoformat()),
-                    trade_data.get("status", "completed"),
-                    trade_data.get("notes", "")
-                ))
+                SELECT trade_id, ticker, action, quantity, price, timestamp
+                FROM trades 
+                WHERE user_id = ? 
+                ORDER BY timestamp DESC 
+                LIMIT ?
+                ''', (user_id, limit))
                 
-                conn.commit()
-                conn.close()
-                return True
+                return self._rows_to_dicts(cursor, cursor.fetchall())
         except Exception:
-            return False
+            return []
     
-    def get_user_trades(self, user_id: str, limit: int = 50) -> List[Dict]:
-        """Get recent trades for a user"""
+    def iter_user_trades(self, user_id: str, limit: int = 50) -> Iterator[Dict]:
+        """Yield recent trades for a user, streaming rows instead of loading them all"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self._conn() as conn:
                 cursor = conn.cursor()
+                cursor.arraysize = _FETCH_ARRAYSIZE
                 
                 cursor.execute('''
                 SELECT * FROM trades 
@@ -441,55 +795,38 @@ class DatabaseManager:
                 LIMIT ?
                 ''', (user_id, limit))
                 
-                rows = cursor.fetchall()
-                conn.close()
-                
-                return [self._row_to_dict(row) for row in rows]
+                while True:
+                    rows = cursor.fetchmany()
+                    if not rows:
+                        break
+                    yield from self._rows_to_dicts(cursor, rows)
         except Exception:
-            return []
+            return
     
     def save_watchlist(self, user_id: str, tickers: List[str], name: str = "Default") -> bool:
-        """Save user's watchlist"""
+        """Save user's watchlist (a repeated ticker is kept once, at its first position)"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self.lock, self._conn() as conn:
                 cursor = conn.cursor()
                 
-                # Check if watchlist exists
+                # The id is derived from (user_id, name), so the primary key doubles as the upsert key
+                watchlist_id = f"watchlist_{user_id}_{name}"
                 cursor.execute('''
-                SELECT watchlist_id FROM watchlists 
-                WHERE user_id = ? AND name = ?
-                ''', (user_id, name))
+                INSERT INTO watchlists (
+                    watchlist_id, user_id, name, tickers, created_at
+                ) VALUES (?, ?, ?, NULL, ?)
+                ON CONFLICT(watchlist_id) DO UPDATE
+                SET tickers = NULL, created_at = excluded.created_at
+                ''', (
+                    watchlist_id,
+                    user_id,
+                    name,
+                    datetime.now().isoformat()
+                ))
                 
-                existing = cursor.fetchone()
-                
-                if existing:
-                    # Update existing
-                    cursor.execute('''
-                    UPDATE watchlists 
-                    SET tickers = ?, created_at = ?
-                    WHERE watchlist_id = ?
-                    ''', (
-                        json.dumps(tickers),
-                        datetime.now().isoformat(),
-                        existing["watchlist_id"]
-                    ))
-                else:
-                    # Create new
-                    cursor.execute('''
-                    INSERT INTO watchlists (
-                        watchlist_id, user_id, name, tickers, created_at
-                    ) VALUES (?, ?, ?, ?, ?)
-                    ''', (
-                        f"watchlist_{user_id}_{name}",
-                        user_id,
-                        name,
-                        json.dumps(tickers),
-                        datetime.now().isoformat()
-                    ))
+                self._sync_watchlist_tickers(cursor, watchlist_id, tickers)
                 
                 conn.commit()
-                conn.close()
                 return True
         except Exception:
             return False
@@ -497,57 +834,76 @@ class DatabaseManager:
     def get_watchlist(self, user_id: str, name: str = "Default") -> List[str]:
         """Get user's watchlist"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
-                SELECT tickers FROM watchlists 
+                SELECT watchlist_id, tickers FROM watchlists 
                 WHERE user_id = ? AND name = ?
                 ''', (user_id, name))
                 
                 row = cursor.fetchone()
-                conn.close()
+                if not row:
+                    return []
                 
-                if row and row["tickers"]:
-                    return json.loads(row["tickers"])
-                return []
+                # Legacy rows still carry their tickers as JSON until the next save
+                if row["tickers"]:
+                    return _json_loads(row["tickers"])
+                
+                cursor.execute('''
+                SELECT ticker FROM watchlist_tickers
+                WHERE watchlist_id = ?
+                ORDER BY position
+                ''', (row["watchlist_id"],))
+                
+                return [ticker_row["ticker"] for ticker_row in cursor.fetchall()]
         except Exception:
             return []
     
     def create_alert(self, alert_data: Dict) -> bool:
         """Create a new price alert"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self.lock, self._conn() as conn:
                 cursor = conn.cursor()
+                now = datetime.now()
                 
-                cursor.execute('''
-                INSERT INTO alerts (
-                    alert_id, user_id, ticker, alert_type,
-                    condition, threshold, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    alert_data.get("alert_id", f"alert_{datetime.now().timestamp()}"),
+                cursor.execute(_INSERT_ALERT_SQL, (
+                    alert_data.get("alert_id", f"alert_{now.timestamp()}"),
                     alert_data["user_id"],
                     alert_data["ticker"],
                     alert_data["alert_type"],
-                    json.dumps(alert_data.get("condition", {})),
+                    _json_dumps(alert_data.get("condition", {})),
                     alert_data["threshold"],
-                    datetime.now().isoformat()
+                    now.isoformat()
                 ))
                 
                 conn.commit()
-                conn.close()
                 return True
         except Exception:
             return False
     
+    def create_alerts_bulk(self, alerts: List[Dict]) -> int:
+        """Create many price alerts in one transaction, returning how many were inserted"""
+        now = datetime.now()
+        now_iso = now.isoformat()
+        rows = [
+            (
+                alert_data.get("alert_id", f"alert_{now.timestamp()}_{i}"),
+                alert_data["user_id"],
+                alert_data["ticker"],
+                alert_data["alert_type"],
+                _json_dumps(alert_data.get("condition", {})),
+                alert_data["threshold"],
+                now_iso
+            )
+            for i, alert_data in enumerate(alerts)
+        ]
+        return self._insert_bulk(_INSERT_ALERT_SQL, _PG_INSERT_ALERT_SQL, rows, "alerts")
+    
     def get_user_alerts(self, user_id: str) -> List[Dict]:
         """Get all alerts for a user"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -557,9 +913,8 @@ class DatabaseManager:
                 ''', (user_id,))
                 
                 rows = cursor.fetchall()
-                conn.close()
                 
-                return [self._row_to_dict(row) for row in rows]
+                return self._rows_to_dicts(cursor, rows)
         except Exception:
             return []
     
@@ -568,18 +923,16 @@ class DatabaseManager:
         try:
             expiry = (datetime.now() + timedelta(hours=24)).isoformat()
             
-            with self.lock:
-                conn = self._get_connection()
+            with self.lock, self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
                 UPDATE users 
                 SET reset_token = ?, reset_token_expiry = ?
                 WHERE user_id = ?
-                ''', (token, expiry, user_id))
+                ''', (self._hash_reset_token(token), expiry, user_id))
                 
                 conn.commit()
-                conn.close()
                 return True
         except Exception:
             return False
@@ -587,17 +940,15 @@ class DatabaseManager:
     def get_user_by_reset_token(self, token: str) -> Optional[str]:
         """Get user_id by reset token (if valid)"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
                 SELECT user_id FROM users 
                 WHERE reset_token = ? AND reset_token_expiry > ?
-                ''', (token, datetime.now().isoformat()))
+                ''', (self._hash_reset_token(token), datetime.now().isoformat()))
                 
                 row = cursor.fetchone()
-                conn.close()
                 
                 if row:
                     return row["user_id"]
@@ -605,11 +956,14 @@ class DatabaseManager:
         except Exception:
             return None
     
+    def _hash_reset_token(self, token: str) -> bytes:
+        """SHA-256 of a reset token - only the digest is stored, never the token itself"""
+        return hashlib.sha256(token.encode('utf-8')).digest()
+    
     def clear_reset_token(self, user_id: str) -> bool:
         """Clear reset token after use"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self.lock, self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -619,7 +973,6 @@ class DatabaseManager:
                 ''', (user_id,))
                 
                 conn.commit()
-                conn.close()
                 return True
         except Exception:
             return False
@@ -627,8 +980,7 @@ class DatabaseManager:
     def update_password(self, user_id: str, new_hash: str) -> bool:
         """Update user's password hash"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self.lock, self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -638,7 +990,6 @@ class DatabaseManager:
                 ''', (new_hash, user_id))
                 
                 conn.commit()
-                conn.close()
                 return True
         except Exception:
             return False
@@ -646,52 +997,109 @@ class DatabaseManager:
     def cache_market_data(self, ticker: str, data_type: str, data: Any, ttl_minutes: int = 60):
         """Cache market data to reduce API calls"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self.cache_lock, self._conn(cache=True) as conn:
                 cursor = conn.cursor()
                 
                 cache_id = f"{ticker}_{data_type}"
-                expiry = (datetime.now() + timedelta(minutes=ttl_minutes)).isoformat()
+                now_ms = time.time_ns() // 1_000_000
                 
-                cursor.execute('''
-                INSERT OR REPLACE INTO market_data_cache
-                (cache_id, ticker, data_type, data, timestamp, expiry)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
+                cursor.execute(_UPSERT_CACHE_SQL, (
                     cache_id,
                     ticker,
                     data_type,
-                    json.dumps(data),
-                    datetime.now().isoformat(),
-                    expiry
+                    _json_dumps_bytes(data),
+                    now_ms,
+                    now_ms + ttl_minutes * 60_000
                 ))
                 
                 conn.commit()
-                conn.close()
         except Exception:
             pass
     
+    def cache_market_data_bulk(self, entries: List[Dict], ttl_minutes: int = 60) -> int:
+        """
+        Cache many market data entries in one transaction
+        
+        Args:
+            entries: dicts with "ticker", "data_type" and "data" keys
+            ttl_minutes: minutes until every entry expires
+        
+        Returns:
+            Number of entries written
+        """
+        now_ms = time.time_ns() // 1_000_000
+        expiry = now_ms + ttl_minutes * 60_000
+        rows = [
+            (
+                f"{entry['ticker']}_{entry['data_type']}",
+                entry["ticker"],
+                entry["data_type"],
+                _json_dumps_bytes(entry["data"]),
+                now_ms,
+                expiry
+            )
+            for entry in entries
+        ]
+        # Cache rows are rebuilt on a miss, so they don't need a durable commit
+        return self._insert_bulk(
+            _UPSERT_CACHE_SQL, _PG_UPSERT_CACHE_SQL, rows, "market data", durable=False, cache=True
+        )
+    
+    def _insert_bulk(self, sql: str, pg_sql: str, rows: List[tuple], label: str,
+                     durable: bool = True, cache: bool = False) -> int:
+        """
+        Insert rows in batches inside one transaction
+        
+        Args:
+            sql: SQLite statement with ? placeholders, run through executemany
+            pg_sql: PostgreSQL statement with a single VALUES %s, run through execute_values
+            rows: parameter tuples
+            label: what is being inserted, for the error message
+            durable: False lets PostgreSQL skip waiting on the WAL flush at commit
+            cache: write to the market data cache database instead of the main one
+        
+        Returns:
+            Number of rows inserted, 0 on failure
+        """
+        if not rows:
+            return 0
+        
+        try:
+            with (self.cache_lock if cache else self.lock), self._conn(cache=cache) as conn:
+                cursor = conn.cursor()
+                if self.db_type == "postgresql":
+                    from psycopg2.extras import execute_values
+                    
+                    if not durable:
+                        cursor.execute("SET LOCAL synchronous_commit = OFF")
+                    execute_values(cursor, pg_sql, rows, page_size=_BULK_BATCH_SIZE)
+                else:
+                    for start in range(0, len(rows), _BULK_BATCH_SIZE):
+                        cursor.executemany(sql, rows[start:start + _BULK_BATCH_SIZE])
+                
+                conn.commit()
+                return len(rows)
+        except Exception as e:
+            print(f"Error bulk inserting {label}: {e}")
+            return 0
+    
     def get_cached_market_data(self, ticker: str, data_type: str) -> Optional[Any]:
         """Get cached market data if not expired"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self._conn(cache=True) as conn:
                 cursor = conn.cursor()
                 
                 cache_id = f"{ticker}_{data_type}"
                 
                 cursor.execute('''
-                SELECT data, expiry FROM market_data_cache 
-                WHERE cache_id = ?
-                ''', (cache_id,))
+                SELECT data FROM market_data_cache 
+                WHERE cache_id = ? AND expiry > ?
+                ''', (cache_id, time.time_ns() // 1_000_000))
                 
                 row = cursor.fetchone()
-                conn.close()
                 
                 if row:
-                    expiry = datetime.fromisoformat(row["expiry"])
-                    if datetime.now() < expiry:
-                        return json.loads(row["data"])
+                    return _json_loads(row["data"])
             return None
         except Exception:
             return None
@@ -701,39 +1109,18 @@ class DatabaseManager:
         try:
             date = datetime.now().strftime("%Y-%m-%d")
             
-            with self.lock:
-                conn = self._get_connection()
-                cursor = conn.cursor()
-                
-                # Check if entry exists for today
-                cursor.execute('''
-                SELECT usage_id, count FROM api_usage 
-                WHERE user_id = ? AND endpoint = ? AND date = ?
-                ''', (user_id, endpoint, date))
-                
-                row = cursor.fetchone()
-                
-                if row:
-                    # Update existing
-                    cursor.execute('''
-                    UPDATE api_usage 
-                    SET count = count + 1 
-                    WHERE usage_id = ?
-                    ''', (row["usage_id"],))
-                else:
-                    # Create new
-                    cursor.execute('''
-                    INSERT INTO api_usage (usage_id, user_id, endpoint, count, date)
-                    VALUES (?, ?, ?, 1, ?)
-                    ''', (
-                        f"usage_{user_id}_{endpoint}_{date}",
-                        user_id,
-                        endpoint,
-                        date
-                    ))
-                
-                conn.commit()
-                conn.close()
+            # Start today's counter at 1 or bump the existing one in a single statement.
+            # Fire-and-forget: the writer thread commits it with whatever else is queued.
+            self._submit_write('''
+            INSERT INTO api_usage (usage_id, user_id, endpoint, count, date)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT(user_id, endpoint, date) DO UPDATE SET count = count + 1
+            ''', (
+                f"usage_{user_id}_{endpoint}_{date}",
+                user_id,
+                endpoint,
+                date
+            ))
         except Exception:
             pass
     
@@ -743,8 +1130,7 @@ class DatabaseManager:
             date = datetime.now().strftime("%Y-%m-%d")
         
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self._conn() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -753,7 +1139,6 @@ class DatabaseManager:
                 ''', (user_id, endpoint, date))
                 
                 row = cursor.fetchone()
-                conn.close()
                 
                 if row:
                     return row["count"]
@@ -770,31 +1155,191 @@ class DatabaseManager:
             
             os.makedirs(os.path.dirname(backup_path), exist_ok=True)
             
-            with self.lock:
-                conn = self._get_connection()
-                backup_conn = sqlite3.connect(backup_path)
-                
-                conn.backup(backup_conn)
-                
-                backup_conn.close()
-                conn.close()
+            with self._conn() as conn:
+                if sqlite3.sqlite_version_info >= (3, 27, 0):
+                    # VACUUM INTO copies one read snapshot, so concurrent WAL writers neither
+                    # block it nor restart it. It refuses to overwrite an existing file, so remove it first
+                    if os.path.exists(backup_path):
+                        os.remove(backup_path)
+                    conn.execute("VACUUM INTO ?", (backup_path,))
+                else:
+                    # An online backup restarts whenever another connection commits,
+                    # so hold the write lock until it is done
+                    with self.lock, closing(sqlite3.connect(backup_path)) as backup_conn:
+                        conn.backup(backup_conn, pages=200)
             
             return True
         except Exception as e:
             print(f"Backup failed: {e}")
             return False
     
+    def _sync_holdings(self, cursor, portfolio_id: str, holdings: Dict):
+        """Write only the tickers whose holding changed, and delete the ones no longer held"""
+        cursor.execute('''
+        SELECT ticker, quantity, cost_basis, extra FROM portfolio_holdings WHERE portfolio_id = ?
+        ''', (portfolio_id,))
+        current = {
+            row["ticker"]: (row["quantity"], row["cost_basis"], row["extra"])
+            for row in cursor.fetchall()
+        }
+        
+        wanted = {ticker: self._holding_row(value) for ticker, value in holdings.items()}
+        
+        removed = [(portfolio_id, ticker) for ticker in current.keys() - wanted.keys()]
+        changed = [
+            (portfolio_id, ticker) + row
+            for ticker, row in wanted.items()
+            if current.get(ticker) != row
+        ]
+        
+        if removed:
+            cursor.executemany(
+                'DELETE FROM portfolio_holdings WHERE portfolio_id = ? AND ticker = ?', removed
+            )
+        if changed:
+            cursor.executemany('''
+            INSERT OR REPLACE INTO portfolio_holdings (portfolio_id, ticker, quantity, cost_basis, extra)
+            VALUES (?, ?, ?, ?, ?)
+            ''', changed)
+    
+    @staticmethod
+    def _is_number(value) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    
+    def _holding_row(self, value) -> tuple:
+        """Split a holdings dict value into (quantity, cost_basis, extra) columns
+        
+        A bare number is stored as quantity with extra NULL. Anything else keeps
+        its shape: numeric quantity/cost_basis go to their columns and the rest
+        of the value is kept as JSON in extra (a JSON object for dicts). Numbers
+        come back equal but may switch between int and float (see the schema).
+        """
+        if self._is_number(value):
+            return (value, None, None)
+        if not isinstance(value, dict):
+            return (None, None, _json_dumps(value))
+        
+        rest = dict(value)
+        quantity = rest.pop("quantity") if self._is_number(rest.get("quantity")) else None
+        cost_basis = rest.pop("cost_basis") if self._is_number(rest.get("cost_basis")) else None
+        return (quantity, cost_basis, _json_dumps(rest))
+    
+    def _holding_value(self, row):
+        """Fold a portfolio_holdings row back into its holdings dict value"""
+        if row["extra"] is None:
+            return row["quantity"]
+        
+        rest = _json_loads(row["extra"])
+        if not isinstance(rest, dict):
+            return rest
+        
+        value = {}
+        if row["quantity"] is not None:
+            value["quantity"] = row["quantity"]
+        if row["cost_basis"] is not None:
+            value["cost_basis"] = row["cost_basis"]
+        value.update(rest)
+        return value
+    
+    def _sync_watchlist_tickers(self, cursor, watchlist_id: str, tickers: List[str]):
+        """Write only the tickers that were added or moved, and delete the ones dropped"""
+        cursor.execute('''
+        SELECT ticker, position FROM watchlist_tickers WHERE watchlist_id = ?
+        ''', (watchlist_id,))
+        current = {row["ticker"]: row["position"] for row in cursor.fetchall()}
+        
+        # A ticker can only appear once, the first occurrence sets its position
+        wanted = {ticker: position for position, ticker in enumerate(dict.fromkeys(tickers))}
+        
+        removed = [(watchlist_id, ticker) for ticker in current.keys() - wanted.keys()]
+        changed = [
+            (watchlist_id, ticker, position)
+            for ticker, position in wanted.items()
+            if current.get(ticker) != position
+        ]
+        
+        if removed:
+            cursor.executemany(
+                'DELETE FROM watchlist_tickers WHERE watchlist_id = ? AND ticker = ?', removed
+            )
+        if changed:
+            cursor.executemany('''
+            INSERT OR REPLACE INTO watchlist_tickers (watchlist_id, ticker, position)
+            VALUES (?, ?, ?)
+            ''', changed)
+    
+    def _submit_write(self, sql: str, params: tuple) -> Future:
+        """Queue a write for the writer thread; the future resolves to True once committed"""
+        future = Future()
+        self._write_q.put((sql, params, future))
+        return future
+    
+    def _writer_loop(self):
+        """Drain queued writes and commit each batch in a single transaction"""
+        while True:
+            batch = [self._write_q.get()]
+            # Whatever piled up during the previous commit joins this one
+            while len(batch) < _WRITE_BATCH_MAX:
+                try:
+                    batch.append(self._write_q.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                self._commit_write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._write_q.task_done()
+    
+    def _commit_write_batch(self, batch: List[tuple]):
+        """Run a batch of queued writes in one transaction and resolve their futures"""
+        applied = []
+        try:
+            with self.lock, self._conn() as conn:
+                cursor = conn.cursor()
+                for sql, params, future in batch:
+                    # A failing statement is undone on its own; the rest of the batch still commits
+                    try:
+                        cursor.execute(sql, params)
+                        applied.append(future)
+                    except Exception as e:
+                        future.set_exception(e)
+                
+                conn.commit()
+        except Exception as e:
+            # Covers a failed commit as well as a connection, lock or cursor that never got going
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for future in applied:
+            future.set_result(True)
+    
     def _row_to_dict(self, row) -> Dict:
         """Convert database row to dictionary"""
-        if hasattr(row, "keys"):  # Already a dict-like object
-            return dict(row)
-        else:  # SQLite Row object
-            return {description[0]: value for description, value in zip(row.description, row)}
+        # Both sqlite3.Row and psycopg2's RealDictRow expose keys()
+        return dict(row)
+    
+    def _rows_to_dicts(self, cursor, rows) -> List[Dict]:
+        """Convert fetched rows to dictionaries, reading the column names once"""
+        if rows and isinstance(rows[0], dict):  # RealDictRow is already keyed
+            return [dict(row) for row in rows]
+        columns = tuple(description[0] for description in cursor.description)
+        return [dict(zip(columns, row)) for row in rows]
     
     def export_user_data(self, user_id: str) -> Dict:
         """Export all user data for GDPR compliance"""
         try:
-            user_data = self.get_user_by_id(user_id)
+            # Reads take no lock and each borrows its own pooled connection, so run them side by side
+            with ThreadPoolExecutor(max_workers=5, thread_name_prefix="export") as pool:
+                user_future = pool.submit(self.get_user_by_id, user_id)
+                portfolios_future = pool.submit(self.get_user_portfolios, user_id)
+                trades_future = pool.submit(self.get_user_trades, user_id, 1000)
+                watchlist_future = pool.submit(self.get_watchlist, user_id)
+                alerts_future = pool.submit(self.get_user_alerts, user_id)
+            
+            user_data = user_future.result()
             if not user_data:
                 return {}
             
@@ -803,11 +1348,10 @@ class DatabaseManager:
             user_data.pop("reset_token", None)
             user_data.pop("reset_token_expiry", None)
             
-            # Get all related data
-            portfolios = self.get_user_portfolios(user_id)
-            trades = self.get_user_trades(user_id, limit=1000)
-            watchlist = self.get_watchlist(user_id)
-            alerts = self.get_user_alerts(user_id)
+            portfolios = portfolios_future.result()
+            trades = trades_future.result()
+            watchlist = watchlist_future.result()
+            alerts = alerts_future.result()
             
             return {
                 "user": user_data,
@@ -823,8 +1367,7 @@ class DatabaseManager:
     def delete_user_data(self, user_id: str) -> bool:
         """Delete all user data (GDPR right to be forgotten)"""
         try:
-            with self.lock:
-                conn = self._get_connection()
+            with self.lock, self._conn() as conn:
                 cursor = conn.cursor()
                 
                 # Anonymize user data instead of deleting (for legal compliance)
@@ -839,17 +1382,20 @@ class DatabaseManager:
                 ''', (anonymized_email, anonymized_username, "deleted", user_id))
                 
                 conn.commit()
-                conn.close()
                 return True
         except Exception:
             return False
 
-# Create singleton instance
+# Singleton instance, created on first call
 db_manager = None
+_db_manager_lock = threading.Lock()
 
 def get_database_manager():
     """Get or create singleton DatabaseManager instance"""
     global db_manager
+    # Double-checked so concurrent first calls from Streamlit threads build only one instance
     if db_manager is None:
-        db_manager = DatabaseManager()
+        with _db_manager_lock:
+            if db_manager is None:
+                db_manager = DatabaseManager()
     return db_manager
\ No newline at end of file
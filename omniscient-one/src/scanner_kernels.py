@@ -0,0 +1,151 @@
+"""
+Scanner Scoring Kernels
+Numba-compiled scoring math used by the Absolute Best Scanner
+"""
+
+import numpy as np
+
+# Try to import Numba for JIT compilation
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in so the kernels still run as plain Python"""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+@njit(parallel=True, nogil=True, cache=True)
+def analyze_batch(close_tails, close_lengths, volume_tails, volume_lengths):
+    """
+    Score every ticker in one parallel pass
+
+    Args:
+        close_tails: (n, 20) close matrix from stack_tails
+        close_lengths: full close history length per row
+        volume_tails: (n, 20) volume matrix from stack_tails
+        volume_lengths: full volume history length per row (0 if unavailable)
+
+    Returns:
+        (n, 4) float64 matrix of total, momentum, volume and trend scores
+    """
+    n = close_tails.shape[0]
+    out = np.empty((n, 4))
+
+    for i in prange(n):
+        momentum = momentum_score(close_tails[i], close_lengths[i])
+        volume = volume_score(volume_tails[i], volume_lengths[i])
+        trend = trend_score(close_tails[i], close_lengths[i])
+
+        out[i, 0] = momentum * 0.4 + volume * 0.3 + trend * 0.3
+        out[i, 1] = momentum
+        out[i, 2] = volume
+        out[i, 3] = trend
+
+    return out
+
+
+@njit(cache=True)
+def momentum_score(close, length):
+    """Calculate momentum score"""
+    if length < 10:
+        return 50.0
+
+    n = close.shape[0]
+    recent_change = (close[n - 1] - close[n - 5]) / close[n - 5] * 100.0
+
+    momentum = 50.0 + recent_change * 2.0
+    return max(0.0, min(100.0, momentum))
+
+
+@njit(cache=True)
+def volume_score(volume, length):
+    """Calculate volume score"""
+    if length < 10:
+        return 50.0
+
+    # One pass over the tail for both the 5- and 20-bar means, skipping NaNs
+    n = volume.shape[0]
+    recent_total = long_total = 0.0
+    recent_seen = long_seen = 0
+    for j in range(max(0, n - 20), n):
+        if not np.isnan(volume[j]):
+            long_total += volume[j]
+            long_seen += 1
+            if j >= n - 5:
+                recent_total += volume[j]
+                recent_seen += 1
+
+    recent_volume = recent_total / recent_seen if recent_seen else np.nan
+    if length >= 20:
+        avg_volume = long_total / long_seen if long_seen else np.nan
+    else:
+        avg_volume = recent_volume
+
+    if avg_volume == 0:
+        return 50.0
+
+    volume_ratio = recent_volume / avg_volume
+
+    if volume_ratio > 2:
+        return 90.0
+    elif volume_ratio > 1.5:
+        return 75.0
+    elif volume_ratio > 1:
+        return 60.0
+    else:
+        return 40.0
+
+
+@njit(cache=True)
+def trend_score(close, length):
+    """Calculate trend strength (85 up, 15 down, 50 sideways)"""
+    # Fewer than 20 bars means no meaningful long average
+    if length < 20:
+        return 50.0
+
+    n = close.shape[0]
+    last = close[n - 1]
+    ma_short = 0.0
+    ma_long = 0.0
+    for j in range(n - 20, n):
+        ma_long += close[j]
+        if j >= n - 10:
+            ma_short += close[j]
+    ma_short /= 10.0
+    ma_long /= 20.0
+
+    if last > ma_short and ma_short > ma_long:
+        return 85.0
+    elif last < ma_short and ma_short < ma_long:
+        return 15.0
+    return 50.0
+
+
+def stack_tails(arrays, width):
+    """
+    Right-align the last `width` values of each array into one matrix
+
+    Args:
+        arrays: list of 1-D float64 arrays, oldest value first
+        width: number of trailing values to keep per array
+
+    Returns:
+        Tuple of (matrix, lengths) - a (n, width) float64 matrix padded
+        with NaN on the left, and each array's full length
+    """
+    matrix = np.full((len(arrays), width), np.nan)
+    lengths = np.empty(len(arrays), dtype=np.int64)
+
+    for i, values in enumerate(arrays):
+        tail = values[max(0, values.shape[0] - width):]
+        matrix[i, width - tail.shape[0]:] = tail
+        lengths[i] = values.shape[0]
+
+    return matrix, lengths
+
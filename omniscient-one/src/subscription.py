@@ -4,19 +4,315 @@ Handles subscription plans, payments, billing, and account upgrades
 """
 
 import streamlit as st
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-import json
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+import importlib.util
+import atexit
+import logging
 import os
-import uuid
+import queue
+import threading
+import time
+import types
+
+from ._json import loads as _json_loads
+
+logger = logging.getLogger("omniscient.subscription")
+
+# Stripe is only imported on first use (see _ensure_stripe) - just check it is installed
+STRIPE_AVAILABLE = importlib.util.find_spec("stripe") is not None
+
+# Subscription plans by tier id, shared by every manager (treat as read-only)
+_PLANS: Dict[str, Dict] = {
+    "free": {
+        "name": "Free",
+        "price_monthly": 0,
+        "price_yearly": 0,
+        "stripe_price_id_monthly": "",
+        "stripe_price_id_yearly": "",
+        "features": [
+            "Basic Dashboard",
+            "Delayed Market Data (15-min)",
+            "5 Stock Watchlist",
+            "Basic Technical Analysis",
+            "Email Support"
+        ],
+        "limits": {
+            "max_portfolios": 1,
+            "max_alerts": 5,
+            "daily_scans": 3,
+            "api_calls_per_day": 100,
+            "data_refresh_interval": 15,  # minutes
+            "real_time_data": False,
+            "advanced_indicators": False,
+            "ai_predictions": False,
+            "whale_detection": False,
+            "automated_trading": False,
+            "api_access": False
+        },
+        "trial_days": 0
+    },
+    "basic": {
+        "name": "Basic",
+        "price_monthly": 29.99,
+        "price_yearly": 299.99,  # ~$25/month with annual discount
+        "stripe_price_id_monthly": "price_basic_monthly",
+        "stripe_price_id_yearly": "price_basic_yearly",
+        "features": [
+            "Everything in Free",
+            "Real-time Market Data",
+            "Unlimited Watchlist",
+            "AI Price Predictions",
+            "Basic Trade Signals",
+            "Email & SMS Alerts",
+            "Priority Support"
+        ],
+        "limits": {
+            "max_portfolios": 3,
+            "max_alerts": 20,
+            "daily_scans": 10,
+            "api_calls_per_day": 500,
+            "data_refresh_interval": 1,  # minute
+            "real_time_data": True,
+            "advanced_indicators": True,
+            "ai_predictions": True,
+            "whale_detection": False,
+            "automated_trading": False,
+            "api_access": False
+        },
+        "trial_days": 7
+    },
+    "premium": {
+        "name": "Premium",
+        "price_monthly": 99.99,
+        "price_yearly": 999.99,  # ~$83/month with annual discount
+        "stripe_price_id_monthly": "price_premium_monthly",
+        "stripe_price_id_yearly": "price_premium_yearly",
+        "features": [
+            "Everything in Basic",
+            "Absolute Best Scanner",
+            "Advanced AI Predictions",
+            "Whale Detection",
+            "Portfolio Optimizer",
+            "Market Narratives",
+            "Advanced Technical Indicators",
+            "API Access",
+            "Discord Community",
+            "Weekly Strategy Reports"
+        ],
+        "limits": {
+            "max_portfolios": 10,
+            "max_alerts": 100,
+            "daily_scans": 50,
+            "api_calls_per_day": 2000,
+            "data_refresh_interval": 1,  # minute
+            "real_time_data": True,
+            "advanced_indicators": True,
+            "ai_predictions": True,
+            "whale_detection": True,
+            "automated_trading": False,
+            "api_access": True
+        },
+        "trial_days": 14
+    },
+    "ultimate": {
+        "name": "Ultimate",
+        "price_monthly": 199.99,
+        "price_yearly": 1999.99,  # ~$166/month with annual discount
+        "stripe_price_id_monthly": "price_ultimate_monthly",
+        "stripe_price_id_yearly": "price_ultimate_yearly",
+        "features": [
+            "Everything in Premium",
+            "Automated Trading",
+            "Institutional Grade Data",
+            "Custom Indicators",
+            "Dedicated Account Manager",
+            "Weekly 1-on-1 Strategy Sessions",
+            "White Label Solutions",
+            "Priority API Access",
+            "24/7 Phone Support",
+            "Custom Development"
+        ],
+        "limits": {
+            "max_portfolios": 50,
+            "max_alerts": 500,
+            "daily_scans": 1000,
+            "api_calls_per_day": 10000,
+            "data_refresh_interval": 1,  # minute
+            "real_time_data": True,
+            "advanced_indicators": True,
+            "ai_predictions": True,
+            "whale_detection": True,
+            "automated_trading": True,
+            "api_access": True
+        },
+        "trial_days": 30
+    }
+}
+
+# Feature names gated by a boolean plan limit
+_FEATURE_LIMIT_KEYS = {
+    "real_time_data": "real_time_data",
+    "ai_predictions": "ai_predictions",
+    "whale_detection": "whale_detection",
+    "portfolio_optimizer": "advanced_indicators",
+    "automated_trading": "automated_trading",
+    "api_access": "api_access"
+}
+
+# One bit per gated feature, OR-ed together into Plan.flags
+_FEATURE_BITS = {feature: 1 << i for i, feature in enumerate(_FEATURE_LIMIT_KEYS)}
+
+
+@dataclass(frozen=True, slots=True)
+class Plan:
+    """Immutable subscription plan with its feature gates packed into a bitfield"""
+    tier: str
+    name: str
+    price_monthly: float
+    price_yearly: float
+    features: Tuple[str, ...]
+    limits: Mapping[str, Any]
+    trial_days: int
+    flags: int
+
+
+def _build_plan(tier: str, plan: Dict) -> Plan:
+    """Freeze one _PLANS entry into a Plan"""
+    flags = 0
+    for feature, bit in _FEATURE_BITS.items():
+        if plan["limits"].get(_FEATURE_LIMIT_KEYS[feature], False):
+            flags |= bit
+    
+    return Plan(
+        tier=tier,
+        name=plan["name"],
+        price_monthly=plan["price_monthly"],
+        price_yearly=plan["price_yearly"],
+        features=tuple(plan["features"]),
+        limits=types.MappingProxyType(dict(plan["limits"])),
+        trial_days=plan["trial_days"],
+        flags=flags
+    )
+
+
+# Plan objects by tier id, built once at import
+_PLAN_OBJECTS: Dict[str, Plan] = {tier: _build_plan(tier, plan) for tier, plan in _PLANS.items()}
+
+# Gated features the free tier lacks - most users are on free, so they are checked first
+_PAID_FEATURES = frozenset(
+    feature for feature, bit in _FEATURE_BITS.items() if not _PLAN_OBJECTS["free"].flags & bit
+)
+
+# Tiers from cheapest to most expensive, and each tier's position
+_TIER_ORDER = ("free", "basic", "premium", "ultimate")
+_TIER_INDEX = {tier: i for i, tier in enumerate(_TIER_ORDER)}
+
+# Usage at which a tier is close enough to its limits to suggest an upgrade (80%)
+_UPGRADE_THRESHOLDS: Dict[str, Tuple[float, float, float]] = {
+    tier: (
+        plan["limits"]["max_alerts"] * 0.8,
+        plan["limits"]["daily_scans"] * 0.8,
+        plan["limits"]["api_calls_per_day"] * 0.8
+    )
+    for tier, plan in _PLANS.items()
+}
+
+# Verified webhook events waiting for the background worker, and how it batches them
+_WEBHOOK_QUEUE_SIZE = 1024
+_WEBHOOK_BATCH_MAX = 100
+_WEBHOOK_MAX_WAIT = 0.1  # seconds
+
+def _upgrade_savings(current: Dict, target: Dict) -> Tuple[float, float, Tuple[str, ...]]:
+    """(monthly savings, yearly savings, new features) of moving from one plan to another"""
+    # Compare feature value
+    current_features = frozenset(current["features"])
+    new_features = tuple(f for f in target["features"] if f not in current_features)
+    
+    # Calculate monetary value of new features
+    feature_value = len(new_features) * 20  # Approx $20 per feature
+    
+    monthly_savings = feature_value - (target["price_monthly"] - current["price_monthly"])
+    yearly_savings = (feature_value * 12) - (target["price_yearly"] - current["price_yearly"])
+    return max(0, monthly_savings), max(0, yearly_savings), new_features
+
+
+# (current tier, target tier) -> upgrade savings, for every pair of plans
+_SAVINGS: Dict[Tuple[str, str], Tuple[float, float, Tuple[str, ...]]] = {
+    (src, dst): _upgrade_savings(_PLANS[src], _PLANS[dst])
+    for src in _PLANS
+    for dst in _PLANS
+}
+
+# Mock billing history returned until real billing records are wired in
+_BILLING_HISTORY_DEFAULT = (
+    {
+        "date": "2024-01-15",
+        "description": "Premium Subscription",
+        "amount": 99.99,
+        "status": "paid"
+    },
+    {
+        "date": "2023-12-15",
+        "description": "Premium Subscription",
+        "amount": 99.99,
+        "status": "paid"
+    }
+)
+
+# ISO expiry string -> Unix timestamp, so reruns compare numbers instead of re-parsing
+_EXPIRY_EPOCHS: Dict[str, float] = {}
+_EXPIRY_EPOCHS_MAX = 4096
+
+
+def _expiry_epoch(expiry_date: str) -> float:
+    """Unix timestamp of an ISO expiry, -inf if it cannot be parsed"""
+    epoch = _EXPIRY_EPOCHS.get(expiry_date)
+    if epoch is None:
+        try:
+            epoch = datetime.fromisoformat(expiry_date).timestamp()
+        except Exception:
+            epoch = float("-inf")
+        
+        if len(_EXPIRY_EPOCHS) >= _EXPIRY_EPOCHS_MAX:
+            _EXPIRY_EPOCHS.clear()
+        _EXPIRY_EPOCHS[expiry_date] = epoch
+    return epoch
+
+
+def _is_webhook_event(event: Any) -> bool:
+    """Whether a decoded payload has the type and data.object the webhook worker reads"""
+    if not isinstance(event, dict) or not isinstance(event.get('type'), str):
+        return False
+    data = event.get('data')
+    return isinstance(data, dict) and isinstance(data.get('object'), dict)
+
+
+def _plan_info(tier: str) -> Dict:
+    """Plan summary for a tier - a fresh dict each call, so callers may modify it"""
+    plan = _PLAN_OBJECTS.get(tier)
+    if plan is None:
+        return {}
+    
+    return {
+        "name": plan.name,
+        "tier": plan.tier,
+        "price_monthly": plan.price_monthly,
+        "price_yearly": plan.price_yearly,
+        "features": list(plan.features),
+        "limits": dict(plan.limits)
+    }
+
+
+def _can_access(tier: str, feature_name: str) -> bool:
+    """Feature gate for a tier - unknown tiers are denied, ungated features allowed"""
+    plan = _PLAN_OBJECTS.get(tier)
+    if plan is None:
+        return False
+    bit = _FEATURE_BITS.get(feature_name)
+    return bit is None or bool(plan.flags & bit)
 
-# Try to import Stripe for payment processing
-try:
-    import stripe
-    STRIPE_AVAILABLE = True
-except ImportError:
-    STRIPE_AVAILABLE = False
-    stripe = None
 
 class SubscriptionManager:
     """Complete subscription and payment management system"""
@@ -24,150 +320,69 @@ class SubscriptionManager:
     def __init__(self):
         # Initialize Stripe if available
         self.stripe_enabled = False
+        self._stripe = None
+        self._stripe_key = None
+        self._stripe_lock = threading.Lock()
+        self._http_session = None
+        
+        # Read once - st.secrets goes through Streamlit's secrets machinery on every access
+        self._app_url = st.secrets.get("APP_URL", os.getenv("APP_URL", "https://omniscient-one.streamlit.app"))
+        self._webhook_secret = st.secrets.get("STRIPE_WEBHOOK_SECRET",
+                                              os.getenv("STRIPE_WEBHOOK_SECRET", ""))
+        
+        # Checkout redirects (the doubled braces keep Stripe's {CHECKOUT_SESSION_ID} placeholder)
+        self._success_url = f"{self._app_url}/success?session_id={{CHECKOUT_SESSION_ID}}"
+        self._cancel_url = f"{self._app_url}/cancel"
+        
         if STRIPE_AVAILABLE:
             stripe_key = st.secrets.get("STRIPE_SECRET_KEY", os.getenv("STRIPE_SECRET_KEY"))
             if stripe_key:
-                stripe.api_key = stripe_key
+                self._stripe_key = stripe_key
                 self.stripe_enabled = True
+                
+                # Webhooks are verified inline, then applied in batches by a background worker
+                self._wh_queue = queue.Queue(maxsize=_WEBHOOK_QUEUE_SIZE)
+                threading.Thread(target=self._drain_webhooks, name="stripe-webhooks", daemon=True).start()
+                atexit.register(self._wh_queue.join)
                 print("✅ Stripe payment processing enabled")
             else:
                 print("⚠️ Stripe secret key not found - payment processing disabled")
-        
-        # Define subscription plans
-        self.plans = {
-            "free": {
-                "name": "Free",
-                "price_monthly": 0,
-                "price_yearly": 0,
-                "stripe_price_id_monthly": "",
-                "stripe_price_id_yearly": "",
-                "features": [
-                    "Basic Dashboard",
-                    "Delayed Market Data (15-min)",
-                    "5 Stock Watchlist",
-                    "Basic Technical Analysis",
-                    "Email Support"
-                ],
-                "limits": {
-                    "max_portfolios": 1,
-                    "max_alerts": 5,
-                    "daily_scans": 3,
-                    "api_calls_per_day": 100,
-                    "data_refresh_interval": 15,  # minutes
-                    "real_time_data": False,
-                    "advanced_indicators": False,
-                    "ai_predictions": False,
-                    "whale_detection": False,
-                    "automated_trading": False,
-                    "api_access": False
-                },
-                "trial_days": 0
-            },
-            "basic": {
-                "name": "Basic",
-                "price_monthly": 29.99,
-                "price_yearly": 299.99,  # ~$25/month with annual discount
-                "stripe_price_id_monthly": "price_basic_monthly",
-                "stripe_price_id_yearly": "price_basic_yearly",
-                "features": [
-                    "Everything in Free",
-                    "Real-time Market Data",
-                    "Unlimited Watchlist",
-                    "AI Price Predictions",
-                    "Basic Trade Signals",
-                    "Email & SMS Alerts",
-                    "Priority Support"
-                ],
-                "limits": {
-                    "max_portfolios": 3,
-                    "max_alerts": 20,
-                    "daily_scans": 10,
-                    "api_calls_per_day": 500,
-                    "data_refresh_interval": 1,  # minute
-                    "real_time_data": True,
-                    "advanced_indicators": True,
-                    "ai_predictions": True,
-                    "whale_detection": False,
-                    "automated_trading": False,
-                    "api_access": False
-                },
-                "trial_days": 7
-            },
-            "premium": {
-                "name": "Premium",
-                "price_monthly": 99.99,
-                "price_yearly": 999.99,  # ~$83/month with annual discount
-                "stripe_price_id_monthly": "price_premium_monthly",
-                "stripe_price_id_yearly": "price_premium_yearly",
-                "features": [
-                    "Everything in Basic",
-                    "Absolute Best Scanner",
-                    "Advanced AI Predictions",
-                    "Whale Detection",
-                    "Portfolio Optimizer",
-                    "Market Narratives",
-                    "Advanced Technical Indicators",
-                    "API Access",
-                    "Discord Community",
-                    "Weekly Strategy Reports"
-                ],
-                "limits": {
-                    "max_portfolios": 10,
-                    "max_alerts": 100,
-                    "daily_scans": 50,
-                    "api_calls_per_day": 2000,
-                    "data_refresh_interval": 1,  # minute
-                    "real_time_data": True,
-                    "advanced_indicators": True,
-                    "ai_predictions": True,
-                    "whale_detection": True,
-                    "automated_trading": False,
-                    "api_access": True
-                },
-                "trial_days": 14
-            },
-            "ultimate": {
-                "name": "Ultimate",
-                "price_monthly": 199.99,
-                "price_yearly": 1999.99,  # ~$166/month with annual discount
-                "stripe_price_id_monthly": "price_ultimate_monthly",
-                "stripe_price_id_yearly": "price_ultimate_yearly",
-                "features": [
-                    "Everything in Premium",
-                    "Automated Trading",
-                    "Institutional Grade Data",
-                    "Custom Indicators",
-                    "Dedicated Account Manager",
-                    "Weekly 1-on-1 Strategy Sessions",
-                    "White Label Solutions",
-                    "Priority API Access",
-                    "24/7 Phone Support",
-                    "Custom Development"
-                ],
-                "limits": {
-                    "max_portfolios": 50,
-                    "max_alerts": 500,
-                    "daily_scans": 1000,
-                    "api_calls_per_day": 10000,
-                    "data_refresh_interval": 1,  # minute
-                    "real_time_data": True,
-                    "advanced_indicators": True,
-                    "ai_predictions": True,
-                    "whale_detection": True,
-                    "automated_trading": True,
-                    "api_access": True
-                },
-                "trial_days": 30
-            }
-        }
+    
+    def _ensure_stripe(self):
+        """Import and configure the Stripe SDK on first use"""
+        if self._stripe is None:
+            with self._stripe_lock:
+                if self._stripe is None:
+                    import stripe
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    
+                    stripe.api_key = self._stripe_key
+                    
+                    # One pooled keep-alive session for every Stripe call instead of a new TLS connection each
+                    self._http_session = requests.Session()
+                    self._http_session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=3))
+                    self._http_client = stripe.http_client.RequestsClient(
+                        session=self._http_session, verify_ssl_certs=True
+                    )
+                    stripe.default_http_client = self._http_client
+                    
+                    self._stripe = stripe
+        return self._stripe
+    
+    def close(self):
+        """Release the pooled Stripe HTTP connections"""
+        if self._http_session is not None:
+            self._http_session.close()
+            self._http_session = None
     
     def get_plan(self, plan_id: str) -> Optional[Dict]:
         """Get plan details by ID"""
-        return self.plans.get(plan_id)
+        return _PLANS.get(plan_id)
     
     def get_all_plans(self) -> Dict[str, Dict]:
         """Get all available plans"""
-        return self.plans
+        return _PLANS
     
     def create_checkout_session(self, user_email: str, user_id: str, 
                                plan_id: str, period: str = "monthly") -> Optional[str]:
@@ -199,6 +414,7 @@ class SubscriptionManager:
                 return None
             
             # Create checkout session
+            stripe = self._ensure_stripe()
             session = stripe.checkout.Session.create(
                 payment_method_types=['card'],
                 line_items=[{
@@ -206,8 +422,8 @@ class SubscriptionManager:
                     'quantity': 1,
                 }],
                 mode='subscription',
-                success_url=f"{self._get_app_url()}/success?session_id={{CHECKOUT_SESSION_ID}}",
-                cancel_url=f"{self._get_app_url()}/cancel",
+                success_url=self._success_url,
+                cancel_url=self._cancel_url,
                 customer_email=user_email,
                 client_reference_id=user_id,
                 metadata={
@@ -228,29 +444,26 @@ class SubscriptionManager:
         if not self.stripe_enabled:
             return False, "Stripe not configured"
         
+        stripe = self._ensure_stripe()
         try:
-            webhook_secret = st.secrets.get("STRIPE_WEBHOOK_SECRET", 
-                                           os.getenv("STRIPE_WEBHOOK_SECRET", ""))
-            
-            event = stripe.Webhook.construct_event(
-                payload, sig_header, webhook_secret
+            # Verify against the raw body, then decode it ourselves instead of through
+            # construct_event's stdlib json and StripeObject wrapping - the worker only reads plain keys
+            body = payload.decode("utf-8") if isinstance(payload, (bytes, bytearray)) else payload
+            stripe.WebhookSignature.verify_header(
+                body, sig_header, self._webhook_secret, stripe.Webhook.DEFAULT_TOLERANCE
             )
+            event = _json_loads(payload)
             
-            # Handle the event
-            if event['type'] == 'checkout.session.completed':
-                session = event['data']['object']
-                self._handle_successful_payment(session)
-                
-            elif event['type'] == 'customer.subscription.updated':
-                subscription = event['data']['object']
-                self._handle_subscription_update(subscription)
-                
-            elif event['type'] == 'customer.subscription.deleted':
-                subscription = event['data']['object']
-                self._handle_subscription_cancellation(subscription)
+            # Reject malformed events now, while Stripe can still be told to retry
+            if not _is_webhook_event(event):
+                raise ValueError("expected an event with type and data.object")
             
-            return True, "Webhook processed successfully"
+            # Hand off to the worker - a non-2xx answer makes Stripe retry later if we are backed up
+            self._wh_queue.put_nowait(event)
+            return True, "Webhook accepted"
             
+        except queue.Full:
+            return False, "Webhook queue full"
         except ValueError as e:
             return False, f"Invalid payload: {str(e)}"
         except stripe.error.SignatureVerificationError as e:
@@ -258,17 +471,82 @@ class SubscriptionManager:
         except Exception as e:
             return False, f"Webhook error: {str(e)}"
     
-    def _handle_successful_payment(self, session: Dict):
-        """Handle successful payment"""
+    def _drain_webhooks(self):
+        """Collect queued webhook events for up to _WEBHOOK_MAX_WAIT and apply them as one batch"""
+        while True:
+            batch = [self._wh_queue.get()]
+            deadline = time.monotonic() + _WEBHOOK_MAX_WAIT
+            while len(batch) < _WEBHOOK_BATCH_MAX:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._wh_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                self._process_webhook_batch(batch)
+            except Exception:
+                logger.exception("Webhook batch of %d events failed", len(batch))
+            finally:
+                for _ in batch:
+                    self._wh_queue.task_done()
+    
+    def _process_webhook_batch(self, events: List[Dict]):
+        """Apply a batch of webhook events, writing all completed checkouts in one transaction"""
+        upgrades = []
+        now = datetime.now()
+        
+        for event in events:
+            # One bad event must not cost the rest of the batch
+            try:
+                if event['type'] == 'checkout.session.completed':
+                    upgrade = self._subscription_from_payment(event['data']['object'], now)
+                    if upgrade:
+                        upgrades.append(upgrade)
+                    
+                elif event['type'] == 'customer.subscription.updated':
+                    subscription = event['data']['object']
+                    self._handle_subscription_update(subscription)
+                    
+                elif event['type'] == 'customer.subscription.deleted':
+                    subscription = event['data']['object']
+                    self._handle_subscription_cancellation(subscription)
+            except Exception:
+                logger.exception("Failed to handle webhook event %s", event.get('id'))
+        
+        if not upgrades:
+            return
+        
         from .database import get_database_manager
         db = get_database_manager()
         
-        user_id = session.get('metadata', {}).get('user_id')
-        plan_id = session.get('metadata', {}).get('plan')
-        period = session.get('metadata', {}).get('period')
+        # Update users' subscriptions in database, one row at a time if the batch write fails
+        if db.update_subscriptions_bulk(upgrades):
+            applied = upgrades
+        else:
+            logger.warning("Bulk subscription update failed, retrying %d rows one by one", len(upgrades))
+            applied = []
+            for upgrade in upgrades:
+                if db.update_subscription(*upgrade):
+                    applied.append(upgrade)
+                else:
+                    logger.error("Could not apply subscription %s for user %s", upgrade[1], upgrade[0])
+        
+        # Send confirmation emails (in production)
+        for user_id, plan_id, _ in applied:
+            print(f"Payment successful: User {user_id} upgraded to {plan_id}")
+    
+    def _subscription_from_payment(self, session: Dict, now: datetime) -> Optional[Tuple[str, str, str]]:
+        """(user_id, plan_id, expiry) for a completed checkout session, or None if incomplete"""
+        metadata = session.get('metadata') or {}
+        user_id = metadata.get('user_id')
+        plan_id = metadata.get('plan')
+        period = metadata.get('period')
         
         if not user_id or not plan_id:
-            return
+            return None
         
         # Calculate expiry date
         if period == "yearly":
@@ -276,13 +554,8 @@ class SubscriptionManager:
         else:
             expiry_days = 30
         
-        expiry_date = datetime.now() + timedelta(days=expiry_days)
-        
-        # Update user's subscription in database
-        db.update_subscription(user_id, plan_id, expiry_date.isoformat())
-        
-        # Send confirmation email (in production)
-        print(f"Payment successful: User {user_id} upgraded to {plan_id}")
+        expiry_date = now + timedelta(days=expiry_days)
+        return user_id, plan_id, expiry_date.isoformat()
     
     def _handle_subscription_update(self, subscription: Dict):
         """Handle subscription updates"""
@@ -298,44 +571,17 @@ class SubscriptionManager:
     
     def _get_app_url(self) -> str:
         """Get application URL for redirects"""
-        return st.secrets.get("APP_URL", os.getenv("APP_URL", "https://omniscient-one.streamlit.app"))
+        return self._app_url
     
     def get_user_plan_info(self, user_tier: str) -> Dict:
         """Get user's current plan information"""
-        plan = self.get_plan(user_tier)
-        if not plan:
-            return {}
-        
-        return {
-            "name": plan["name"],
-            "tier": user_tier,
-            "price_monthly": plan["price_monthly"],
-            "price_yearly": plan["price_yearly"],
-            "features": plan["features"],
-            "limits": plan["limits"]
-        }
+        return _plan_info(user_tier)
     
     def can_user_access_feature(self, user_tier: str, feature_name: str) -> bool:
         """Check if user can access a specific feature"""
-        plan = self.get_plan(user_tier)
-        if not plan:
+        if user_tier == "free" and feature_name in _PAID_FEATURES:
             return False
-        
-        # Map feature names to limit keys
-        feature_map = {
-            "real_time_data": "real_time_data",
-            "ai_predictions": "ai_predictions",
-            "whale_detection": "whale_detection",
-            "portfolio_optimizer": "advanced_indicators",
-            "automated_trading": "automated_trading",
-            "api_access": "api_access"
-        }
-        
-        limit_key = feature_map.get(feature_name)
-        if limit_key:
-            return plan["limits"].get(limit_key, False)
-        
-        return True  # Default to True for unspecified features
+        return _can_access(user_tier, feature_name)
     
     def get_upgrade_recommendation(self, current_tier: str, usage_stats: Dict) -> str:
         """
@@ -348,56 +594,34 @@ class SubscriptionManager:
         Returns:
             Recommended tier or "none" if current is sufficient
         """
-        current_plan = self.get_plan(current_tier)
-        if not current_plan:
+        thresholds = _UPGRADE_THRESHOLDS.get(current_tier)
+        index = _TIER_INDEX.get(current_tier)
+        if thresholds is None or index is None:
             return "none"
         
-        # Analyze usage
-        alerts_used = usage_stats.get("alerts_used", 0)
-        alerts_limit = current_plan["limits"]["max_alerts"]
-        
-        scans_used = usage_stats.get("scans_used", 0)
-        scans_limit = current_plan["limits"]["daily_scans"]
-        
-        api_calls_used = usage_stats.get("api_calls_used", 0)
-        api_calls_limit = current_plan["limits"]["api_calls_per_day"]
+        alerts_threshold, scans_threshold, api_calls_threshold = thresholds
         
         # Check if user is hitting limits
-        if (alerts_used >= alerts_limit * 0.8 or 
-            scans_used >= scans_limit * 0.8 or 
-            api_calls_used >= api_calls_limit * 0.8):
+        if (usage_stats.get("alerts_used", 0) >= alerts_threshold or 
+            usage_stats.get("scans_used", 0) >= scans_threshold or 
+            usage_stats.get("api_calls_used", 0) >= api_calls_threshold):
             
             # Recommend next tier
-            tier_order = ["free", "basic", "premium", "ultimate"]
-            current_index = tier_order.index(current_tier)
-            
-            if current_index < len(tier_order) - 1:
-                return tier_order[current_index + 1]
+            if index < len(_TIER_ORDER) - 1:
+                return _TIER_ORDER[index + 1]
         
         return "none"
     
     def calculate_savings(self, current_tier: str, target_tier: str) -> Dict:
         """Calculate potential savings from upgrading"""
-        current_plan = self.get_plan(current_tier)
-        target_plan = self.get_plan(target_tier)
-        
-        if not current_plan or not target_plan:
+        savings = _SAVINGS.get((current_tier, target_tier))
+        if savings is None:
             return {"monthly_savings": 0, "yearly_savings": 0}
         
-        # Compare feature value
-        current_features = set(current_plan["features"])
-        target_features = set(target_plan["features"])
-        new_features = target_features - current_features
-        
-        # Calculate monetary value of new features
-        feature_value = len(new_features) * 20  # Approx $20 per feature
-        
-        monthly_savings = feature_value - (target_plan["price_monthly"] - current_plan["price_monthly"])
-        yearly_savings = (feature_value * 12) - (target_plan["price_yearly"] - current_plan["price_yearly"])
-        
+        monthly_savings, yearly_savings, new_features = savings
         return {
-            "monthly_savings": max(0, monthly_savings),
-            "yearly_savings": max(0, yearly_savings),
+            "monthly_savings": monthly_savings,
+            "yearly_savings": yearly_savings,
             "new_features": list(new_features)
         }
     
@@ -408,6 +632,7 @@ class SubscriptionManager:
             return None
         
         try:
+            stripe = self._ensure_stripe()
             coupon = stripe.Coupon.create(
                 percent_off=discount_percent,
                 duration=duration,
@@ -432,37 +657,25 @@ class SubscriptionManager:
         try:
             # This would require having the user's Stripe customer ID
             # For now, return mock data
-            invoice_id = f"inv_{uuid.uuid4().hex[:8]}"
+            invoice_id = f"inv_{os.urandom(4).hex()}"
+            now = datetime.now()
             
             return {
                 "invoice_id": invoice_id,
                 "amount": amount,
                 "description": description,
                 "status": "draft",
-                "created_at": datetime.now().isoformat(),
-                "due_date": (datetime.now() + timedelta(days=30)).isoformat()
+                "created_at": now.isoformat(),
+                "due_date": (now + timedelta(days=30)).isoformat()
             }
         except Exception:
             return None
     
     def get_billing_history(self, user_id: str) -> List[Dict]:
         """Get user's billing history"""
-        # In production, this would fetch from Stripe or your database
-        # For now, return mock data
-        return [
-            {
-                "date": "2024-01-15",
-                "description": "Premium Subscription",
-                "amount": 99.99,
-                "status": "paid"
-            },
-            {
-                "date": "2023-12-15",
-                "description": "Premium Subscription",
-                "amount": 99.99,
-                "status": "paid"
-            }
-        ]
+        # In production, this would fetch from your database (TTL-cached, not Stripe per call)
+        # For now, return mock data - a new list, but the entries are shared
+        return list(_BILLING_HISTORY_DEFAULT)
     
     def cancel_subscription(self, user_id: str) -> bool:
         """Cancel user's subscription"""
@@ -480,18 +693,18 @@ class SubscriptionManager:
         if user_tier == "free":
             return True  # Free tier is always active
         
-        try:
-            expiry = datetime.fromisoformat(expiry_date)
-            return datetime.now() < expiry
-        except Exception:
-            return False
+        return time.time() < _expiry_epoch(expiry_date)
 
-# Create singleton instance
+# Singleton instance, created on first call
 subscription_manager = None
+_subscription_manager_lock = threading.Lock()
 
 def get_subscription_manager():
     """Get or create singleton SubscriptionManager instance"""
     global subscription_manager
+    # Double-checked so concurrent first calls from Streamlit threads build only one instance
     if subscription_manager is None:
-        subscription_manager = SubscriptionManager()
+        with _subscription_manager_lock:
+            if subscription_manager is None:
+                subscription_manager = SubscriptionManager()
     return subscription_manager
\ No newline at end of file